@@ -1,18 +1,23 @@
 """
 Module containing the main application
 """
+import math
 import os
+import random
 import threading
 import time
 
+import numpy as np
 import pygame
 
 from cardumen.config import Config
 from cardumen.database import Database
-from cardumen.display import Display
+from cardumen.display import Display, OffscreenDisplay
 from cardumen.handler import Handler
 from cardumen.logger import log, set_log_level, set_log_file
+from cardumen.renderer import RendererProcess
 from cardumen.scene import PlaygroundScene
+from cardumen.snapshot import SnapshotBuffer
 
 
 class App:
@@ -31,10 +36,28 @@ class App:
 
         Handler().set_config(config)
 
-        pygame.init()
+        if config.SEED is not None:
+            log.info(f"Seeding random number generators with {config.SEED}")
+            random.seed(config.SEED)
+            np.random.seed(config.SEED)
+
+        if not config.HEADLESS:
+            pygame.init()
 
         self.running = False
-        if config.RENDER:
+        self.ticks_per_second = None
+        self._render_thread = None
+        self._renderer = None
+        self.display = None
+        if config.HEADLESS and config.HEADLESS_RENDER:
+            log.info(f"Headless mode, rendering offscreen every {config.RENDER_EVERY} ticks")
+            self.display = OffscreenDisplay(config.WINDOW_SIZE, config.RENDER_SIZE)
+        elif config.HEADLESS:
+            log.info("Headless mode, rendering disabled")
+        elif config.RENDER and config.RENDER_PROCESS:
+            log.info("Rendering enabled, in a separate process")
+            self._renderer = RendererProcess(config_path, config.RENDER_CAPACITY)
+        elif config.RENDER:
             log.info("Rendering enabled")
             self._render_thread = threading.Thread(target=self._run_render)
             self.display = Display(config.WINDOW_SIZE)
@@ -43,86 +66,162 @@ class App:
 
         if config.TESTING and os.path.exists(config.DB_PATH):
             os.remove(config.DB_PATH)
-        self.db = Database(config.DB_PATH, config.DB_BUFFER_SIZE)
+        self.db = Database(config.DB_PATH, config.DB_BUFFER_SIZE, config.DB_BUFFER_BYTES, config.DB_QUEUE_SIZE,
+                           config.DB_BACKPRESSURE, config.DB_CACHE_BYTES)
         Handler().set_db(self.db)
         self.db.connect()
 
         self.scene = PlaygroundScene()
         Handler().set_scene(self.scene)
 
+        # the renderer only reads snapshots published after each update
+        self.snapshots = self._renderer if self._renderer is not None else SnapshotBuffer()
+        self.snapshots.publish(self.scene.snapshot())
+
     def run(self) -> None:
         """
         Run app by starting update and render threads and running main loop to handle user input.
         Update and render are performed asynchronously.
+        In headless mode, the scene is instead updated with a fixed timestep as fast as possible.
 
         :return:
         """
         log.info("Running app")
         self.running = True
-        if Handler().config.RENDER:
+        if self._render_thread is not None:
             self._render_thread.start()
+        if self._renderer is not None:
+            self._renderer.start()
 
         try:
-            pygame.fastevent.init()
-            update_timer = pygame.time.get_ticks()
-            last_update = pygame.time.get_ticks()
-            control_ups = []
-            control_nu = 0
-            while self.running:
-                # Read events
-                queue = pygame.fastevent.get()
-                for event in queue:
-                    if event.type == pygame.QUIT:
-                        log.info("App quit")
-                        self.running = False
-                if pygame.key.get_pressed()[pygame.K_ESCAPE]:
-                    log.info("App quit")
-                    self.running = False
-                if not self.running:
-                    break
-
-                # update the scene every UPDATE_RATE seconds
-                if pygame.time.get_ticks() - update_timer >= 1000 / Handler().config.UPDATE_RATE:
-                    update_timer += 1000 / Handler().config.UPDATE_RATE
-                    # update game state
-                    dt = (pygame.time.get_ticks() - last_update) / 1000
-                    self.scene.update(dt)
-                    last_update = pygame.time.get_ticks()
-
-                    # control check
-                    control_ups.append(dt)
-                    control_nu += 1
-                if control_nu >= 100:
-                    log.debug(f"Average updates per second: {round(len(control_ups) / sum(control_ups), 2)} "
-                              f"(target: {Handler().config.UPDATE_RATE})")
-                    control_ups = []
-                    control_nu = 0
-
-                time.sleep(last_update / 1000 + 1 / Handler().config.UPDATE_RATE - pygame.time.get_ticks() / 1000)
+            if Handler().config.HEADLESS:
+                self._run_headless()
+            else:
+                self._run_realtime()
         except KeyboardInterrupt:
             log.info("App interrupted")
         finally:
             self.running = False
-            if Handler().config.RENDER:
+            if self._render_thread is not None:
                 self._render_thread.join()
-            self.db.close()
-            pygame.quit()
-            log.info("App closed")
+            if self.display is not None:
+                self.display.close()
+            if self._renderer is not None:
+                self._renderer.close()
+            self.scene.vision.close()
+            try:
+                # raises if the database writer failed, after closing it
+                self.db.close()
+            finally:
+                pygame.quit()
+                log.info("App closed")
+
+    def _run_realtime(self) -> None:
+        """
+        Run main loop in real time, handling user input and updating the scene every UPDATE_RATE seconds.
+
+        :return:
+        """
+        pygame.fastevent.init()
+        update_timer = pygame.time.get_ticks()
+        last_update = pygame.time.get_ticks()
+        control_ups = []
+        control_nu = 0
+        while self.running:
+            # Read events
+            queue = pygame.fastevent.get()
+            for event in queue:
+                if event.type == pygame.QUIT:
+                    log.info("App quit")
+                    self.running = False
+            if pygame.key.get_pressed()[pygame.K_ESCAPE]:
+                log.info("App quit")
+                self.running = False
+            if self._renderer is not None and self._renderer.closed:
+                log.info("Renderer closed, app quit")
+                self.running = False
+            if not self.running:
+                break
+
+            # update the scene every UPDATE_RATE seconds
+            if pygame.time.get_ticks() - update_timer >= 1000 / Handler().config.UPDATE_RATE:
+                update_timer += 1000 / Handler().config.UPDATE_RATE
+                # update game state
+                dt = (pygame.time.get_ticks() - last_update) / 1000
+                self.scene.update(dt)
+                last_update = pygame.time.get_ticks()
+                if Handler().config.RENDER:
+                    self.snapshots.publish(self.scene.snapshot())
+
+                # control check
+                control_ups.append(dt)
+                control_nu += 1
+            if control_nu >= 100:
+                log.debug(f"Average updates per second: {round(len(control_ups) / sum(control_ups), 2)} "
+                          f"(target: {Handler().config.UPDATE_RATE})")
+                log.debug(f"Collision stats: {self.scene.collision_world.stats}")
+                control_ups = []
+                control_nu = 0
+
+            # no sleep if the update took longer than its period
+            sleep = last_update / 1000 + 1 / Handler().config.UPDATE_RATE - pygame.time.get_ticks() / 1000
+            time.sleep(max(0., sleep))
+
+    def _run_headless(self) -> None:
+        """
+        Run main loop without events or display, updating the scene with a fixed timestep as fast as possible,
+        for HEADLESS_TICKS ticks or HEADLESS_SECONDS simulated seconds.
+        With a fixed timestep and a seed, the simulation is deterministic.
+        With HEADLESS_RENDER, the scene is drawn offscreen every RENDER_EVERY ticks, including the initial state.
+
+        :return:
+        """
+        config = Handler().config
+        dt = config.FIXED_DT
+        if config.HEADLESS_TICKS is not None:
+            n_ticks = config.HEADLESS_TICKS
+        elif config.HEADLESS_SECONDS is not None:
+            n_ticks = math.ceil(config.HEADLESS_SECONDS / dt)
+        else:
+            raise ValueError("Headless mode requires headlessTicks or headlessSeconds")
+
+        log.info(f"Running {n_ticks} ticks of {dt} s")
+        start = time.perf_counter()
+        tick = 0
+        if self.display is not None:
+            self.display.draw_snapshot(self.scene.snapshot())
+        while self.running and tick < n_ticks:
+            self.scene.update(dt)
+            tick += 1
+            if self.display is not None and tick % config.RENDER_EVERY == 0:
+                self.display.draw_snapshot(self.scene.snapshot())
+            if tick % 100 == 0:
+                log.debug(f"Tick {tick}/{n_ticks}, "
+                          f"ticks per second: {round(tick / (time.perf_counter() - start), 2)}")
+                log.debug(f"Collision stats: {self.scene.collision_world.stats}")
+        elapsed = time.perf_counter() - start
+        self.ticks_per_second = tick / elapsed if elapsed > 0 else math.inf
+        log.info(f"Simulated {tick} ticks ({round(tick * dt, 2)} s) in {round(elapsed, 2)} s, "
+                 f"ticks per second: {round(self.ticks_per_second, 2)}")
 
     def _run_render(self) -> None:
         """
         Run main render loop.
         The loop period has a lower-bound defined by the FPS rate.
-        On each iteration, the display is cleared, the scene rendered again and then showed.
+        On each iteration, the last scene snapshot is drawn, updating only the regions that changed.
+        With interpolation, the state one update period in the past is rendered,
+        blended between the two snapshots around it, so that motion is smooth at any FPS.
 
         :return:
         """
         clock = pygame.time.Clock()
         while self.running:
             # Render scene
-            self.display.screen.fill((0, 0, 0))
-            self.scene.render(self.display)
-            pygame.display.flip()
+            if Handler().config.INTERPOLATE:
+                snapshot = self.snapshots.at(time.perf_counter() - 1 / Handler().config.UPDATE_RATE)
+            else:
+                snapshot = self.snapshots.latest()
+            self.display.draw_snapshot(snapshot)
             clock.tick(Handler().config.FPS)
 
 
@@ -3,18 +3,225 @@ Collision detection and response.
 """
 from __future__ import annotations
 
+import itertools
+import math
+import time
 from collections import defaultdict
 
 from cardumen.display import Display
-from cardumen.shapes import Polygon
+from cardumen.shapes import Intersection, Polygon
+
+
+class SpatialHash:
+    """
+    Uniform grid over the world, used as broadphase for collision detection.
+    Items are stored in every cell overlapped by their bounding box.
+    If the world wraps around, cell indices are taken modulo the grid size.
+    """
+
+    def __init__(self, world_size: tuple[float, float], cell_size: float, wrap: bool = True):
+        """
+        Create an empty spatial hash.
+        The cell size is adjusted so that an integer number of cells fits in the world.
+
+        :param world_size: width and height of the world
+        :param cell_size: approximate side length of a cell
+        :param wrap: whether the world is toroidal
+        """
+        width, height = world_size
+        self._nx = max(1, int(width // cell_size))
+        self._ny = max(1, int(height // cell_size))
+        self._cell_w = width / self._nx
+        self._cell_h = height / self._ny
+        self._wrap = wrap
+        self._cells = defaultdict(list)
+
+    def clear(self) -> None:
+        self._cells.clear()
+
+    def insert(self, item, rect: tuple[float, float, float, float]) -> None:
+        """
+        Insert item in all cells overlapped by the bounding box.
+
+        :param item: item to store
+        :param rect: bounding box as (xmin, ymin, xmax, ymax)
+        :return:
+        """
+        for cell in self._get_cells(rect):
+            self._cells[cell].append(item)
+
+    def query(self, rect: tuple[float, float, float, float]) -> dict:
+        """
+        Get all items stored in the cells overlapped by the bounding box.
+        Items are returned without duplicates, in insertion order.
+
+        :param rect: bounding box as (xmin, ymin, xmax, ymax)
+        :return: dict with the found items as keys
+        """
+        found = {}
+        for cell in self._get_cells(rect):
+            for item in self._cells.get(cell, ()):
+                found[item] = True
+        return found
+
+    def _get_cells(self, rect: tuple[float, float, float, float]) -> set[tuple[int, int]]:
+        xmin, ymin, xmax, ymax = rect
+        i0, i1 = math.floor(xmin / self._cell_w), math.floor(xmax / self._cell_w)
+        j0, j1 = math.floor(ymin / self._cell_h), math.floor(ymax / self._cell_h)
+        if self._wrap:
+            # a box larger than the world covers every cell once
+            ii = range(self._nx) if i1 - i0 + 1 >= self._nx else [i % self._nx for i in range(i0, i1 + 1)]
+            jj = range(self._ny) if j1 - j0 + 1 >= self._ny else [j % self._ny for j in range(j0, j1 + 1)]
+        else:
+            ii = range(max(i0, 0), min(i1, self._nx - 1) + 1)
+            jj = range(max(j0, 0), min(j1, self._ny - 1) + 1)
+        return {(i, j) for i in ii for j in jj}
+
+
+class CollisionWorld:
+    """
+    Collision detection for all colliders in a scene.
+    Once per step, broadphase and narrowphase are run for every collider that detects others.
+    The resulting contacts are compared with those of the previous step,
+    and start/ongoing/end callbacks are dispatched in one batch after detection.
+    """
+
+    def __init__(self, world_size: tuple[float, float], cell_size: float, wrap: bool = True):
+        """
+        Create an empty collision world.
+
+        :param world_size: width and height of the world
+        :param cell_size: approximate side length of a broadphase cell
+        :param wrap: whether the world is toroidal
+        """
+        self._world_size = world_size
+        self._cell_size = cell_size
+        self._wrap = wrap
+        self._colliders = {}  # collider -> registration order
+        self._order = itertools.count()
+        self._tag_index = defaultdict(dict)  # inverted index for fast retrieval of colliders
+        self._contacts = {}  # (detector, target) -> True
+        self._removed_contacts = {}  # contacts of removed colliders, pending end callback
+        self.stats = {}
+
+    def add(self, collider: Collider) -> None:
+        """
+        Register collider in the world.
+
+        :param collider: collider
+        :return:
+        """
+        if collider in self._colliders:
+            return
+        self._colliders[collider] = next(self._order)
+        self._tag_index[collider.tag][collider] = True
+        collider.world = self
+
+    def remove(self, collider: Collider) -> None:
+        """
+        Deregister collider from the world.
+        Its own contacts are dropped without callbacks,
+        colliders that were detecting it get their end callback on the next step.
+
+        :param collider: collider
+        :return:
+        """
+        if collider not in self._colliders:
+            return
+        del self._colliders[collider]
+        del self._tag_index[collider.tag][collider]
+        # contacts detecting the removed collider end on the next step, even if it is added back meanwhile
+        for detector, target in self._contacts:
+            if target is collider:
+                self._removed_contacts[(detector, target)] = True
+        self._contacts = {(detector, target): True for detector, target in self._contacts
+                          if collider is not detector and collider is not target}
+        collider._colliding = {}
+        collider.world = None
+
+    def __len__(self) -> int:
+        return len(self._colliders)
+
+    def step(self) -> None:
+        """
+        Detect collisions between all registered colliders and dispatch callbacks.
+        Every unordered pair of colliders is tested at most once,
+        even if both colliders detect each other.
+
+        :return:
+        """
+        t_start = time.perf_counter()
+        detectors = [c for c in self._colliders if c._detect is not None]
+
+        # broadphase
+        grids = {}
+        for tag in {c._detect for c in detectors}:
+            grid = SpatialHash(self._world_size, self._cell_size, self._wrap)
+            for collider in self._tag_index[tag]:
+                grid.insert(collider, collider.get_bounds())
+            grids[tag] = grid
+        candidates = []  # (detector, target, pair)
+        pairs = {}
+        for detector in detectors:
+            for target in grids[detector._detect].query(detector.get_bounds()):
+                if target is detector or (detector._ignore_self and target.parent is detector.parent):
+                    continue
+                if self._colliders[detector] < self._colliders[target]:
+                    pair = (detector, target)
+                else:
+                    pair = (target, detector)
+                pairs[pair] = True
+                candidates.append((detector, target, pair))
+        t_broadphase = time.perf_counter()
+
+        # narrowphase
+        pairs = list(pairs)
+        hits = Intersection.intersect_pairs([a.poly for a, _ in pairs], [b.poly for _, b in pairs], self._wrap)
+        hits = dict(zip(pairs, hits))
+        contacts = {(detector, target): True for detector, target, pair in candidates if hits[pair]}
+        t_narrowphase = time.perf_counter()
+
+        # update state before any callback, so that callbacks see the whole new contact set
+        last_contacts, self._contacts = self._contacts, contacts
+        for detector in detectors:
+            detector._colliding = {}
+        for detector, target in contacts:
+            detector._colliding[target] = True
+        started = ended = 0
+        removed_contacts, self._removed_contacts = self._removed_contacts, {}
+        for detector, target in removed_contacts:
+            if detector in self._colliders:
+                detector.on_collision_end(target)
+                ended += 1
+        for detector, target in contacts:
+            if (detector, target) not in last_contacts:
+                detector.on_collision_start(target)
+                started += 1
+            detector.on_collision(target)
+        for detector, target in last_contacts:
+            if (detector, target) not in contacts and detector in self._colliders:
+                detector.on_collision_end(target)
+                ended += 1
+        t_dispatch = time.perf_counter()
+
+        self.stats = {
+            'colliders': len(self._colliders),
+            'candidates': len(candidates),
+            'pairs': len(pairs),
+            'contacts': len(contacts),
+            'started': started,
+            'ended': ended,
+            'broadphase_ms': 1000 * (t_broadphase - t_start),
+            'narrowphase_ms': 1000 * (t_narrowphase - t_broadphase),
+            'dispatch_ms': 1000 * (t_dispatch - t_narrowphase),
+        }
 
 
 class Collider:
     """
     A collider is a polygon that can be used to detect collisions.
+    Collisions are detected by the CollisionWorld the collider is registered in.
     """
-    # Inverted indices for fast retrieval of colliders
-    _TAG_INDEX = defaultdict(list)
 
     # parent is not type hinted to avoid circular import
     def __init__(self, parent, poly: Polygon, tag: str, detect: str = None, ignore_self: bool = True):
@@ -33,51 +240,27 @@ class Collider:
         self._detect = detect
         self._ignore_self = ignore_self
 
-        Collider._TAG_INDEX[tag].append(self)
-
+        self.world = None  # set when registered in a CollisionWorld
         self._colliding = {}
 
-    def check_collisions(self) -> None:
+    def remove(self) -> None:
         """
-        Check for collisions.
-        First, all colliders with the same tag as this collider are retrieved from the index.
-        Then, for each collider, the polygons are checked for intersection.
-        Once all collisions are detected, the callbacks are called.
+        Deregister collider from its world, if any.
 
         :return:
         """
-        if self._detect is None:
-            return
+        if self.world is not None:
+            self.world.remove(self)
 
-        last_colliding = self._colliding.copy()
-        self._colliding.clear()
-        targets = self._TAG_INDEX[self._detect]
-        # check for collisions
-        for other in targets:
-            if other == self:
-                continue
-            if self._ignore_self and other.parent == self.parent:
-                continue
-            if self.poly.intersects(other.poly):
-                self._colliding[other] = True
-        # call callbacks
-        for other in targets:
-            if self._colliding.get(other):
-                if not last_colliding.get(other):
-                    self.on_collision_start(other)
-                self.on_collision(other)
-            else:
-                if last_colliding.get(other):
-                    self.on_collision_end(other)
-
-    def update(self, dt: float) -> None:
-        """
-        Update collider. Checks for collisions and calls callbacks.
-
-        :param dt: time since last update
-        :return:
+    def get_bounds(self) -> tuple[float, float, float, float]:
+        """
+        Get axis-aligned bounds of the collider, independent of its rotation.
+
+        :return: bounding box as (xmin, ymin, xmax, ymax)
         """
-        self.check_collisions()
+        x, y = self.poly.prs.pos
+        r = self.poly.bounding_radius
+        return x - r, y - r, x + r, y + r
 
     def render(self, display: Display) -> None:
         """
@@ -34,13 +34,40 @@ class Config:
         self.WINDOW_FULLSCREEN = config['windowFullscreen']  # unused
         self.WINDOW_BORDERLESS = config['windowBorderless']  # unused
         self.WRAP = config['wrap']
+        self.COLLISION_CELL_SIZE = config.get('collisionCellSize', 150)
+        self.NEIGHBOUR_CELL_SIZE = config.get('neighbourCellSize', 100)
+        self.VISION_MODE = config.get('visionMode', 'warp')
+        self.VISION_THREADS = config.get('visionThreads', None)  # defaults to the number of CPUs
         self.DB_PATH = config['dbPath']
         self.DB_BUFFER_SIZE = config['dbBufferSize']
+        self.DB_BUFFER_BYTES = config.get('dbBufferBytes', 64 * 2 ** 20)  # rows are also written past this size
+        self.DB_QUEUE_SIZE = config.get('dbQueueSize', 256)  # rows waiting for the database writer thread
+        self.DB_BACKPRESSURE = config.get('dbBackpressure', 'block')  # 'block' or 'drop' rows when the queue is full
+        self.DB_CACHE_BYTES = config.get('dbCacheBytes', 64 * 2 ** 20)  # page cache of the writer
         self.DATA_CONFIG = DataConfig(config['dataConfig'])
         self.LOG_LEVEL = LogLevel[config['logLevel'].upper()]
         self.LOG_FILE = config['logFile']
         self.DEBUG = config['debug']
         self.TESTING = config['testing']
         self.RENDER = config['render']
+        self.RENDER_PROCESS = config.get('renderProcess', False)  # render in a separate process
+        self.RENDER_CAPACITY = config.get('renderCapacity', 1024)  # max entities drawn by the render process
+        self.INTERPOLATE = config.get('interpolate', True)  # render between the last two updates
+        self.HEADLESS = config.get('headless', False)  # fixed timestep, as fast as possible, no events or display
+        self.FIXED_DT = config.get('fixedDt', 1 / self.UPDATE_RATE)  # timestep of headless mode, in seconds
+        self.HEADLESS_TICKS = config.get('headlessTicks', None)  # duration of headless mode, in ticks
+        self.HEADLESS_SECONDS = config.get('headlessSeconds', None)  # or in simulated seconds
+        self.HEADLESS_RENDER = config.get('headlessRender', False)  # draw offscreen in headless mode
+        self.RENDER_EVERY = config.get('renderEvery', 1)  # draw one in every renderEvery headless ticks
+        self.RENDER_SIZE = config.get('renderSize', self.WINDOW_SIZE)  # resolution of offscreen frames
+        self.RECORD_PATH = config.get('recordPath', None)  # video file (.mp4, .avi) or directory of .npy frames
+        # headless videos play at simulated speed
+        self.RECORD_FPS = config.get('recordFps', 1 / (self.RENDER_EVERY * self.FIXED_DT) if self.HEADLESS
+                                     else self.FPS)
+        self.RECORD_POOL_SIZE = config.get('recordPoolSize', 8)  # frames waiting to be written
+        # 'drop' or 'block' frames when the pool is full, headless runs do not lose frames by default
+        self.RECORD_POLICY = config.get('recordPolicy', 'block' if self.HEADLESS else 'drop')
+        self.SEED = config.get('seed', None)
+        self.POLICY_PATH = config.get('policyPath', None)  # weights of an MLPPolicy, random actions if not given
         self.n_fish = config.get('paramNFish', 2)
         self.plot_collider = config.get('paramPlotCollider', False)
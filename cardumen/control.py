@@ -1,21 +1,110 @@
 """
-In this module we define the class that controls the movement of the fish in the scene.
-Fish have two possible actions tilt right and tilt left.
+In this module we define the policies that control the movement of the fish in the scene.
+A policy chooses the actions of the whole school at once, from the stacked observations of all fish.
 """
 import random
+from abc import ABC, abstractmethod
 
 import numpy as np
 
 
-class Agent:
+class Policy(ABC):
+    """
+    Interface of the policies. Observations of all fish are stacked along the first axis.
+    """
+
+    @abstractmethod
+    def act(self, states: np.ndarray, views: np.ndarray) -> np.ndarray:
+        """
+        Get actions of all fish.
+
+        :param states: position and velocity of each fish, shape (n, 4)
+        :param views: view state of each fish, shape (n, height, width, 3)
+        :return: action label of each fish, shape (n,)
+        """
+
+
+class Agent(Policy):
+    """
+    Policy that chooses actions uniformly at random.
+    """
+
     def __init__(self, num_labels: int):
         self.num_labels = num_labels
 
-    def act(self, state: list[np.ndarray]) -> int:
+    def act(self, states: np.ndarray, views: np.ndarray = None) -> np.ndarray:
+        """
+        Get random actions of all fish.
+
+        :param states: position and velocity of each fish, shape (n, 4)
+        :param views: view state of each fish, unused
+        :return: action label of each fish, shape (n,)
+        """
+        return np.array([random.randint(0, self.num_labels - 1) for _ in range(len(states))], dtype=int)
+
+
+class MLPPolicy(Policy):
+    """
+    Multilayer perceptron with ReLU hidden layers, evaluated with NumPy.
+    The input of each fish is its state, followed by its flattened view state scaled to [0, 1] if use_views.
+    The action is the index of the largest output.
+    """
+
+    def __init__(self, weights: list[np.ndarray], biases: list[np.ndarray], use_views: bool = True):
+        """
+        Create a policy from the parameters of its layers.
+
+        :param weights: weight matrix of each layer, shape (n_in, n_out)
+        :param biases: bias vector of each layer, shape (n_out,)
+        :param use_views: whether the view states are part of the input
+        """
+        if len(weights) != len(biases) or not weights:
+            raise ValueError("There must be one bias per weight matrix, and at least one layer")
+        for w1, w2 in zip(weights[:-1], weights[1:]):
+            if w1.shape[1] != w2.shape[0]:
+                raise ValueError(f"Layer shapes {w1.shape} and {w2.shape} do not match")
+        self.weights = [np.asarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.use_views = use_views
+
+    @classmethod
+    def load(cls, path: str) -> 'MLPPolicy':
+        """
+        Load a policy from a .npz file with arrays W0, b0, W1, b1, ... and optionally use_views.
+
+        :param path: path to the file
+        :return: policy
+        """
+        with np.load(path) as data:
+            n_layers = sum(1 for key in data.files if key.startswith('W'))
+            weights = [data[f'W{i}'] for i in range(n_layers)]
+            biases = [data[f'b{i}'] for i in range(n_layers)]
+            use_views = bool(data['use_views']) if 'use_views' in data.files else True
+        return cls(weights, biases, use_views)
+
+    def save(self, path: str) -> None:
+        """
+        Save the policy to a .npz file, readable by load.
+
+        :param path: path to the file
+        :return:
+        """
+        arrays = {f'W{i}': w for i, w in enumerate(self.weights)}
+        arrays.update({f'b{i}': b for i, b in enumerate(self.biases)})
+        np.savez(path, use_views=self.use_views, **arrays)
+
+    def act(self, states: np.ndarray, views: np.ndarray) -> np.ndarray:
         """
-        Get action from agent.
+        Get actions of all fish with one forward pass.
 
-        :param state: current state
-        :return: action label
+        :param states: position and velocity of each fish, shape (n, 4)
+        :param views: view state of each fish, shape (n, height, width, 3)
+        :return: action label of each fish, shape (n,)
         """
-        return random.randint(0, self.num_labels - 1)
+        x = np.asarray(states, dtype=np.float32)
+        if self.use_views:
+            x = np.concatenate([x, views.reshape(len(views), -1).astype(np.float32) / 255], axis=1)
+        for w, b in zip(self.weights[:-1], self.biases[:-1]):
+            x = np.maximum(x @ w + b, 0)
+        x = x @ self.weights[-1] + self.biases[-1]
+        return np.argmax(x, axis=1)
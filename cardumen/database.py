@@ -1,4 +1,6 @@
+import queue
 import sqlite3
+import threading
 
 import numpy as np
 
@@ -30,15 +32,48 @@ class BinaryConverter:
 
 
 class Database:
-    def __init__(self, path: str, buffer_size: int = 1):
+    """
+    SQLite database written by a background thread, so that inserting never waits for the disk.
+    The writer thread owns the connection, in WAL mode, and is fed with serialized rows through a bounded queue.
+    When the queue is full, inserting blocks or drops the row, depending on the backpressure policy.
+    Rows are buffered by the writer and written with one executemany per table, all tables in a single transaction,
+    when buffer_size rows or buffer_bytes bytes are pending, or when flushed.
+    Reads use their own connection, after waiting for the writer to flush.
+    """
+    _ROW, _EXECUTE, _COMMIT, _FLUSH, _STOP = range(5)
+
+    def __init__(self, path: str, buffer_size: int = 1, buffer_bytes: int = 64 * 2 ** 20, queue_size: int = 256,
+                 backpressure: str = 'block', cache_bytes: int = 64 * 2 ** 20):
+        """
+        :param path: path to the database file
+        :param buffer_size: number of rows buffered before writing them
+        :param buffer_bytes: size of the rows buffered before writing them
+        :param queue_size: number of rows waiting for the writer thread
+        :param backpressure: 'block' to wait or 'drop' to discard rows when the queue is full
+        :param cache_bytes: page cache size of the writer connection
+        """
+        if backpressure not in ('block', 'drop'):
+            raise ValueError(f"Unknown backpressure policy: {backpressure}")
         self.path = path
-        self._conn = None
+        self._conn = None  # reader connection
         self._cursor = None
         self._buffer_size = buffer_size
-        self._buffer_items = 0
+        self._buffer_bytes = buffer_bytes
+        self._cache_bytes = cache_bytes
+        self._block = backpressure == 'block'
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._writer = None
+        self._error = None
+        self.dropped = 0
 
     def connect(self):
         log.debug(f"Connecting to database at {self.path}")
+        # the writer sets up WAL mode before the reader connects
+        ready = threading.Event()
+        self._writer = threading.Thread(target=self._run_writer, args=(ready,), daemon=True)
+        self._writer.start()
+        ready.wait()
+        self._check_error()
         self._conn = sqlite3.connect(self.path)
         self._cursor = self._conn.cursor()
 
@@ -46,27 +81,135 @@ class Database:
         return self._cursor
 
     def commit(self, force: bool = False):
-        """Commit the database if the buffer is full."""
-        self._buffer_items += 1
-        if force or self._buffer_items >= self._buffer_size:
-            log.debug(f"Committing {self._buffer_items} items")
-            self._conn.commit()
-            self._buffer_items = 0
+        """Ask the writer to write the buffered rows and commit if forced, otherwise rows wait for a full buffer."""
+        if force:
+            self._put((self._COMMIT, None, None, 0))
+
+    def flush(self):
+        """Wait until every row inserted so far is written and committed."""
+        done = threading.Event()
+        self._put((self._FLUSH, None, done, 0))
+        done.wait()
+        self._check_error()
 
     def close(self):
-        # commit remaining items
-        log.debug(f"Committing {self._buffer_items} items")
-        self._conn.commit()
-        self._buffer_items = 0
+        # write remaining items, the writer is stopped even if it failed
+        log.debug("Stopping database writer")
+        self._queue.put((self._STOP, None, None, 0))
+        self._writer.join()
+        if self.dropped:
+            log.warning(f"Dropped {self.dropped} rows, the database writer could not keep up")
 
         # close connection
         log.debug(f"Closing database connection")
         self._cursor.close()
         self._conn.close()
         self._conn = None
+        self._check_error()
 
     def execute(self, query, params=()):
-        self._conn.execute(query, params)
+        self._put((self._EXECUTE, query, params, 0))
+
+    def insert(self, query: str, params: tuple, nbytes: int = 0):
+        """
+        Queue a row, written together with the other buffered rows.
+
+        :param query: insert statement
+        :param params: values of the row, already serialized
+        :param nbytes: size of the row, counted against the byte budget
+        """
+        if self._block:
+            self._put((self._ROW, query, params, nbytes))
+            return
+        self._check_error()
+        self._check_running()
+        try:
+            self._queue.put_nowait((self._ROW, query, params, nbytes))
+        except queue.Full:
+            if not self.dropped:
+                log.warning("Database writer queue is full, dropping rows")
+            self.dropped += 1
+
+    def _put(self, item: tuple):
+        self._check_error()
+        self._check_running()
+        self._queue.put(item)
+
+    def _check_running(self):
+        # nothing would read the queue, e.g. a flush would wait forever
+        if self._writer is None or not self._writer.is_alive():
+            raise RuntimeError(f"Database {self.path} is not connected")
+
+    def _check_error(self):
+        if self._error is not None:
+            raise RuntimeError("Database writer failed") from self._error
+
+    def _run_writer(self, ready: threading.Event):
+        """
+        Main loop of the writer thread.
+
+        :param ready: set once the connection is set up
+        :return:
+        """
+        conn = None
+        buffers = {}  # insert query -> buffered rows
+        items = 0
+        nbytes = 0
+
+        def write():
+            nonlocal items, nbytes
+            if not items:
+                return
+            log.debug(f"Committing {items} items")
+            with conn:  # commits, or rolls back if an insert fails
+                for query, rows in buffers.items():
+                    if rows:
+                        conn.executemany(query, rows)
+                        rows.clear()
+            items = 0
+            nbytes = 0
+
+        try:
+            conn = sqlite3.connect(self.path)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # with WAL, NORMAL only syncs at checkpoints, committed rows survive a crash of the app
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA cache_size={-(self._cache_bytes // 1024)}')  # negative for KiB
+        except Exception as e:
+            log.error(f"Cannot connect to database at {self.path}: {e}")
+            self._error = e
+        ready.set()
+
+        while True:
+            kind, query, params, size = self._queue.get()
+            try:
+                if self._error is not None:
+                    # keep consuming so that producers never block on a dead writer
+                    pass
+                elif kind == self._ROW:
+                    rows = buffers.get(query)
+                    if rows is None:
+                        rows = buffers[query] = []
+                    rows.append(params)
+                    items += 1
+                    nbytes += size
+                    if items >= self._buffer_size or nbytes >= self._buffer_bytes:
+                        write()
+                elif kind == self._EXECUTE:
+                    write()
+                    conn.execute(query, params)
+                else:
+                    write()
+                    conn.commit()
+            except Exception as e:
+                log.error(f"Database writer failed: {e}")
+                self._error = e
+            if kind == self._FLUSH:
+                params.set()
+            elif kind == self._STOP:
+                break
+        if conn is not None:
+            conn.close()
 
 
 class Table:
@@ -95,8 +238,7 @@ class Table:
         for n, feat in enumerate(features):
             bin_arr = self._bin_converter[n].to_bytes(feat)
             feats.append(bin_arr)
-        self._db.execute(self._add_query, (time, *feats))
-        self._db.commit()
+        self._db.insert(self._add_query, (time, *feats), 8 + sum(map(len, feats)))
 
     def _format_items(self, items: list[tuple]) -> list[tuple]:
         formatted_items = []
@@ -107,12 +249,14 @@ class Table:
 
     def get_all(self):
         log.debug(f"Getting all items from table {self.name}")
+        self._db.flush()
         cur = self._db.cursor()
         cur.execute(f'SELECT * FROM {self.name}')
         return self._format_items(cur.fetchall())
 
     def get_timerange(self, start_time: float, end_time: float):
         log.debug(f"Getting items from table {self.name} between {start_time} and {end_time}")
+        self._db.flush()
         cur = self._db.cursor()
         cur.execute(f'SELECT * FROM {self.name} WHERE time BETWEEN ? AND ?', (start_time, end_time))
         return self._format_items(cur.fetchall())
@@ -1,44 +1,236 @@
+import os
+
 import pygame
 from pygame import Vector2
 
 from cardumen import utils
 from cardumen.geometry import PosRotScale
 from cardumen.handler import Handler
+from cardumen.recorder import FrameRecorder
 from cardumen.sprite import Sprite
 
 
 class Display:
     def __init__(self, screen_size: tuple):
         self.screen_size = Vector2(screen_size)
-        self.screen = pygame.display.set_mode(screen_size)
+        self.screen = self._open_screen()
+
+        # cached static layers and regions drawn in the last frame, see draw_snapshot
+        self._background = None
+        self._background_key = None
+        self._grid = None
+        self._dirty = []
+        # overlay for the polygons of a frame, see draw_polygon
+        self._overlay = None
+        self._overlay_rects = []
+
+        config = Handler().config
+        self.recorder = None
+        if config.RECORD_PATH is not None:
+            self.recorder = FrameRecorder(config.RECORD_PATH, self.frame_size, config.RECORD_FPS,
+                                          config.RECORD_POOL_SIZE, config.RECORD_POLICY)
+
+    def _open_screen(self) -> pygame.Surface:
+        screen = pygame.display.set_mode(self.screen_size)
         pygame.display.set_caption(Handler().config.TITLE)
+        return screen
+
+    def _present(self, rects: list[pygame.Rect] = None) -> None:
+        """
+        Show the drawn frame.
+
+        :param rects: regions that changed, the whole screen if None
+        :return:
+        """
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+
+    @property
+    def frame_size(self) -> tuple[int, int]:
+        return self.screen.get_size()
 
-    def draw_sprite(self, sprite: Sprite, prs: PosRotScale, wrap=True):
+    def frame(self) -> pygame.Surface:
+        """
+        Last drawn frame, as recorded.
+
+        :return: surface, must not be modified
+        """
+        return self.screen
+
+    def draw_sprite(self, sprite: Sprite, prs: PosRotScale, wrap=True) -> list[pygame.Rect]:
         img = sprite.get_transformed(prs.rot, prs.scale)
         rect = img.get_rect(center=prs.pos)
         if wrap and Handler().config.WRAP:
-            for neighbor in utils.get_wraps(rect):
-                self.screen.blit(img, img.get_rect(center=prs.pos + neighbor))
+            return [self.screen.blit(img, img.get_rect(center=prs.pos + neighbor))
+                    for neighbor in utils.get_wraps(rect)]
         else:
-            self.screen.blit(img, rect)
+            return [self.screen.blit(img, rect)]
 
     def draw_polygon(self, points: list[Vector2], fill_color: tuple = (0, 0, 0, 0), line_color: tuple = (0, 0, 0, 0),
-                     wrap=True):
-        surf = pygame.Surface(self.screen_size, pygame.SRCALPHA)
+                     wrap=True) -> list[pygame.Rect]:
+        """
+        Draw polygon into the overlay, which is composited onto the screen by draw_overlay.
+        All polygons of a frame share the overlay, so a polygon covers the ones drawn before it.
+
+        :param points: points in screen coordinates
+        :param fill_color: fill color
+        :param line_color: line color
+        :param wrap: draw copies wrapped around the world
+        :return: overlay regions drawn
+        """
+        if self._overlay is None:
+            self._overlay = pygame.Surface(self.screen_size, pygame.SRCALPHA)
         lx, ly = zip(*points)
         rect = pygame.Rect(min(lx), min(ly), max(lx) - min(lx), max(ly) - min(ly))
         if wrap and Handler().config.WRAP:
-            for neighbor in utils.get_wraps(rect):
+            neighbors = utils.get_wraps(rect)
+            for neighbor in neighbors:
                 npoints = [p + neighbor for p in points]
-                pygame.draw.polygon(surf, fill_color, npoints)
-                pygame.draw.lines(surf, line_color, True, npoints)
+                pygame.draw.polygon(self._overlay, fill_color, npoints)
+                pygame.draw.lines(self._overlay, line_color, True, npoints)
         else:
-            pygame.draw.polygon(surf, fill_color, points)
-            pygame.draw.lines(surf, line_color, True, points)
-        self.screen.blit(surf, (0, 0))
+            neighbors = [Vector2()]
+            pygame.draw.polygon(self._overlay, fill_color, points)
+            pygame.draw.lines(self._overlay, line_color, True, points)
+        # margin for the rounding of the points and the width of the lines
+        rects = [rect.move(neighbor).inflate(4, 4).clip(self._overlay.get_rect()) for neighbor in neighbors]
+        self._overlay_rects += rects
+        return rects
+
+    def draw_overlay(self) -> list[pygame.Rect]:
+        """
+        Composite the polygons drawn since the last call onto the screen, and clear them from the overlay.
+        The overlay is composited once, on top of everything drawn before, e.g. all sprites of a frame,
+        and overlapping polygons do not blend with each other, the last one drawn covers the others.
+        Only the regions touched by polygons are blitted and cleared, merged so that no pixel is blended twice.
+
+        :return: screen regions drawn
+        """
+        rects = self._merge_rects(self._overlay_rects)
+        for rect in rects:
+            self.screen.blit(self._overlay, rect, rect)
+        for rect in rects:
+            self._overlay.fill((0, 0, 0, 0), rect)
+        self._overlay_rects = []
+        return rects
+
+    @staticmethod
+    def _merge_rects(rects: list[pygame.Rect]) -> list[pygame.Rect]:
+        """
+        Replace overlapping rects by their union, until no two rects overlap.
+
+        :param rects: rects
+        :return: non-overlapping rects covering all the given ones
+        """
+        merged = []
+        for rect in rects:
+            rect = rect.copy()
+            i = rect.collidelist(merged)
+            while i >= 0:
+                rect.union_ip(merged.pop(i))
+                i = rect.collidelist(merged)
+            merged.append(rect)
+        return merged
 
-    def draw_grid(self, size: int = 100):
+    def draw_grid(self, size: int = 100, surface: pygame.Surface = None):
+        surface = self.screen if surface is None else surface
         for i in range(0, int(self.screen_size.x), size):
-            pygame.draw.line(self.screen, (0, 0, 0, 50), (i, 0), (i, self.screen_size.y))
+            pygame.draw.line(surface, (0, 0, 0, 50), (i, 0), (i, self.screen_size.y))
         for i in range(0, int(self.screen_size.y), size):
-            pygame.draw.line(self.screen, (0, 0, 0, 50), (0, i), (self.screen_size.x, i))
+            pygame.draw.line(surface, (0, 0, 0, 50), (0, i), (self.screen_size.x, i))
+
+    def draw_snapshot(self, snapshot) -> None:
+        """
+        Draw a scene snapshot and update the screen.
+        Static entities (drawn below all others) are rendered once into a cached background,
+        and the debug grid into a cached overlay. Each frame, only the regions drawn in the last frame
+        are restored from the background, and only those and the regions drawn now are updated on screen.
+        The whole screen is redrawn when the static entities change.
+        If recording, the finished frame is copied to the recorder.
+
+        :param snapshot: snapshot, not type hinted to avoid circular import
+        :return:
+        """
+        static_rows = [row for row, static in enumerate(snapshot.static.tolist()) if static]
+        key = (tuple((snapshot.sprites[row].key, tuple(snapshot.pos[row]), snapshot.rot[row], snapshot.scale[row],
+                      snapshot.wrap[row]) for row in static_rows), snapshot.debug, tuple(self.screen_size))
+        full = key != self._background_key
+        if full:
+            self._background_key = key
+            self._background = pygame.Surface(self.screen_size)
+            self.screen.fill((0, 0, 0))
+            snapshot.render(self, rows=static_rows, grid=False)
+            self._background.blit(self.screen, (0, 0))
+            self._grid = None
+            if snapshot.debug:
+                # black lines on a transparent color key, same as drawing the grid on the screen
+                self._grid = pygame.Surface(self.screen_size)
+                self._grid.fill((255, 0, 255))
+                self._grid.set_colorkey((255, 0, 255))
+                self.draw_grid(surface=self._grid)
+            self._dirty = []
+        else:
+            for rect in self._dirty:
+                self.screen.blit(self._background, rect, rect)
+
+        dynamic_rows = [row for row, static in enumerate(snapshot.static.tolist()) if not static]
+        dirty = snapshot.render(self, rows=dynamic_rows, grid=False)
+        if self._grid is not None:
+            for rect in [self.screen.get_rect()] if full else self._dirty + dirty:
+                self.screen.blit(self._grid, rect, rect)
+        self._present(None if full else self._dirty + dirty)
+        self._dirty = dirty
+        if self.recorder is not None:
+            self.recorder.capture(self.frame())
+
+    def close(self) -> None:
+        """
+        Finish the recording, if any.
+
+        :return:
+        """
+        if self.recorder is not None:
+            self.recorder.close()
+
+
+class OffscreenDisplay(Display):
+    """
+    Display drawing into a Surface that is never shown, for rendering without a screen, e.g. on a server.
+    SDL is started with its dummy video driver, and frames can be scaled to a resolution other than the world size.
+    """
+
+    def __init__(self, screen_size: tuple, frame_size: tuple = None):
+        """
+        Create the offscreen surface.
+
+        :param screen_size: size of the world, drawn at one pixel per unit
+        :param frame_size: resolution of the frames, screen_size by default
+        """
+        self._frame_size = tuple(int(x) for x in (frame_size or screen_size))
+        self._scaled = None
+        super().__init__(screen_size)
+
+    def _open_screen(self) -> pygame.Surface:
+        if not pygame.display.get_init():
+            os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+            pygame.display.init()
+        if pygame.display.get_surface() is None:
+            # a display surface is needed to convert images to a fast pixel format
+            pygame.display.set_mode((1, 1))
+        return pygame.Surface(self.screen_size).convert()
+
+    def _present(self, rects: list[pygame.Rect] = None) -> None:
+        pass
+
+    @property
+    def frame_size(self) -> tuple[int, int]:
+        return self._frame_size
+
+    def frame(self) -> pygame.Surface:
+        if self._frame_size == self.screen.get_size():
+            return self.screen
+        if self._scaled is None:
+            self._scaled = pygame.Surface(self._frame_size, 0, self.screen)
+        return pygame.transform.smoothscale(self.screen, self._frame_size, self._scaled)
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import itertools
+
 from cardumen.collision import Collider
 from cardumen.display import Display
 from cardumen.geometry import PosRotScale
@@ -8,6 +10,8 @@ from cardumen.sprite import Sprite
 
 
 class Entity:
+    _ids = itertools.count()  # never reused, unlike id(), which snapshots rely on to match entities
+
     def __init__(self, prs: PosRotScale, sprite: Sprite = None):
         """
         Create an Entity.
@@ -15,18 +19,28 @@ class Entity:
         :param prs: position, rotation, scale
         :param sprite: sprite to draw
         """
+        self.id = next(Entity._ids)
         self.prs = prs
         self.sprite = sprite
+        self.wrap = True  # draw sprite wrapped around the world
+        self.static = False  # never moves, drawn once into the cached background
         self.colliders = []
 
     def update(self, dt: float) -> None:
         """
-        Update entity.
-        :param dt:
+        Update entity, before collisions are detected.
+        :param dt: time since last update
         :return:
         """
-        for collider in self.colliders:
-            collider.update(dt)
+        pass
+
+    def late_update(self, dt: float) -> None:
+        """
+        Update entity, after collisions are detected and collision callbacks are called.
+        :param dt: time since last update
+        :return:
+        """
+        pass
 
     def render(self, display: Display) -> None:
         """
@@ -34,7 +48,7 @@ class Entity:
         :param display: display to render to
         :return:
         """
-        display.draw_sprite(self.sprite, self.prs)
+        display.draw_sprite(self.sprite, self.prs, wrap=self.wrap)
         if Handler().config.DEBUG:
             for collider in self.colliders:
                 collider.render(display)
@@ -42,6 +56,14 @@ class Entity:
     def add_colliders(self, *colliders: Collider) -> None:
         self.colliders.extend(colliders)
 
+    def remove(self) -> None:
+        """
+        Tear down entity when it leaves the scene. Deregisters its colliders.
+        :return:
+        """
+        for collider in self.colliders:
+            collider.remove()
+
 
 class WaterBg(Entity):
     def __init__(self):
@@ -49,6 +71,5 @@ class WaterBg(Entity):
         super().__init__(PosRotScale(screen_size / 2), Sprite("assets/water.png"))
         # fit screen
         self.sprite.apply_transform(scale=max(screen_size.x / self.sprite.width, screen_size.y / self.sprite.height))
-
-    def render(self, display: Display) -> None:
-        display.draw_sprite(self.sprite, self.prs, wrap=False)
+        self.wrap = False
+        self.static = True
@@ -0,0 +1,281 @@
+"""
+Vectorized environment running many independent headless scenes in worker processes.
+"""
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+import random
+import traceback
+from multiprocessing import shared_memory
+from multiprocessing.connection import Connection
+
+import numpy as np
+
+from cardumen.config import Config
+from cardumen.database import Database
+from cardumen.handler import Handler
+from cardumen.logger import log, set_log_level, set_log_file
+from cardumen.scene import PlaygroundScene
+
+
+class VectorEnv:
+    """
+    N independent headless PlaygroundScenes, stepped with a fixed timestep in a pool of worker processes.
+    Each worker is a separate process with its own Handler (config, database and current scene),
+    so scenes never share global state. Scenes of the same worker are stepped in turn, each with its own
+    random state, so that seeded results do not depend on the number of workers.
+    Actions and observations are exchanged through shared memory, only short commands go through the pipes.
+    """
+
+    def __init__(self, n_envs: int, config_path: str = 'config.json', n_workers: int = None, seed: int = None,
+                 start_method: str = 'spawn'):
+        """
+        Start the workers and create the scenes.
+        Every scene writes its data to its own database, named after DB_PATH with the scene index appended.
+
+        :param n_envs: number of scenes
+        :param config_path: path to the config of the scenes, the same for all of them
+        :param n_workers: number of worker processes, defaults to the number of CPUs
+        :param seed: seed of the first scene, the following scenes are seeded with seed + index
+        :param start_method: multiprocessing start method, 'spawn' starts workers without any inherited state
+        """
+        self.n_envs = n_envs
+        n_workers = max(1, min(n_envs, n_workers or os.cpu_count() or 1))
+        bounds = np.linspace(0, n_envs, n_workers + 1).astype(int)
+        context = mp.get_context(start_method)
+
+        self._conns = []
+        self._processes = []
+        self._shms = []
+        self._closed = False
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            conn, worker_conn = context.Pipe()
+            process = context.Process(target=_run_worker, args=(worker_conn, config_path, range(start, stop), seed),
+                                      daemon=True)
+            process.start()
+            worker_conn.close()
+            self._conns.append(conn)
+            self._processes.append(process)
+
+        # workers report the observation shapes once their scenes are created
+        shapes = set(self._receive())
+        if len(shapes) > 1:
+            self.close()
+            raise ValueError(f"All scenes must have the same number of fish and view size, got {shapes}")
+        self.n_fish, view_shape = shapes.pop()
+
+        self.states = self._allocate((n_envs, self.n_fish, 4), np.float32)
+        self.views = self._allocate((n_envs, self.n_fish, *view_shape), np.uint8)
+        self.actions = self._allocate((n_envs, self.n_fish), np.int64)
+        buffers = {name: (shm.name, array.shape, array.dtype.str) for name, shm, array in
+                   zip(('states', 'views', 'actions'), self._shms, (self.states, self.views, self.actions))}
+        self._call('attach', buffers)
+        log.info(f"Started {n_envs} scenes with {self.n_fish} fish in {n_workers} workers")
+
+    def reset(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Create new scenes, seeded as in the beginning.
+
+        :return: observations, as in step
+        """
+        self._call('reset')
+        return self.states, self.views
+
+    def step(self, actions: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Update all scenes by one tick.
+        The returned arrays are views of the shared buffers, overwritten by the next step.
+
+        :param actions: action label of each fish, shape (n_envs, n_fish), if None they are chosen by the policy of each scene
+        :return: position and velocity of each fish, shape (n_envs, n_fish, 4), and view state of each fish,
+                 shape (n_envs, n_fish, height, width, 3)
+        """
+        if actions is not None:
+            self.actions[:] = actions
+        self._call('step', actions is not None)
+        return self.states, self.views
+
+    def close(self) -> None:
+        """
+        Stop the workers, closing their databases, and release the shared memory.
+
+        :return:
+        """
+        if self._closed:
+            return
+        self._closed = True
+        for conn in self._conns:
+            try:
+                conn.send(('close', None))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        for conn in self._conns:
+            conn.close()
+        # arrays must not reference the buffers once they are closed
+        self.states = self.views = self.actions = None
+        for shm in self._shms:
+            shm.close()
+            shm.unlink()
+        self._shms = []
+
+    def __enter__(self) -> VectorEnv:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _allocate(self, shape: tuple, dtype: type) -> np.ndarray:
+        shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize))
+        self._shms.append(shm)
+        array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        array.fill(0)
+        return array
+
+    def _call(self, command: str, data=None) -> list:
+        # all workers run the command at the same time
+        for conn in self._conns:
+            conn.send((command, data))
+        return self._receive()
+
+    def _receive(self) -> list:
+        results = []
+        errors = []
+        for conn in self._conns:
+            try:
+                status, result = conn.recv()
+            except EOFError:
+                status, result = 'error', "Worker exited unexpectedly"
+            if status == 'error':
+                errors.append(result)
+            results.append(result)
+        if errors:
+            self.close()
+            raise RuntimeError(f"Worker failed:\n{errors[0]}")
+        return results
+
+
+class _SceneWorker:
+    """
+    Scenes of one worker process, with their databases and random states.
+    """
+
+    def __init__(self, config_path: str, env_ids: range, seed: int = None):
+        config = Config(config_path)
+        config.HEADLESS = True
+        config.RENDER = False
+        # parallelism comes from the worker processes
+        config.VISION_THREADS = config.VISION_THREADS or 1
+        set_log_level(config.LOG_LEVEL)
+        set_log_file(config.LOG_FILE)
+        Handler().set_config(config)
+
+        self._config = config
+        self._env_ids = list(env_ids)
+        self._seed = seed
+        self._scenes = []
+        self._dbs = []
+        self._random_states = []
+        self._shms = []
+        self._arrays = {}
+
+    def reset(self, _=None) -> tuple[int, tuple]:
+        self._close_scenes()
+        root, ext = os.path.splitext(self._config.DB_PATH)
+        for env_id in self._env_ids:
+            db_path = f'{root}_{env_id}{ext}'
+            if self._config.TESTING and os.path.exists(db_path):
+                os.remove(db_path)
+            config = self._config
+            db = Database(db_path, config.DB_BUFFER_SIZE, config.DB_BUFFER_BYTES, config.DB_QUEUE_SIZE,
+                          config.DB_BACKPRESSURE, config.DB_CACHE_BYTES)
+            db.connect()
+            Handler().set_db(db)
+            if self._seed is not None:
+                random.seed(self._seed + env_id)
+                np.random.seed(self._seed + env_id)
+            scene = PlaygroundScene()
+            self._scenes.append(scene)
+            self._dbs.append(db)
+            self._random_states.append((random.getstate(), np.random.get_state()))
+        self._write()
+        fishes = self._scenes[0].fishes
+        return len(fishes), fishes[0].view_state.shape if fishes else (0, 0, 3)
+
+    def attach(self, buffers: dict[str, tuple]) -> None:
+        for name, (shm_name, shape, dtype) in buffers.items():
+            # the buffers are owned and unlinked by the main process, workers only close them
+            shm = shared_memory.SharedMemory(name=shm_name)
+            self._shms.append(shm)
+            self._arrays[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        self._write()
+
+    def step(self, use_actions: bool = False) -> None:
+        for i, (env_id, scene, db) in enumerate(zip(self._env_ids, self._scenes, self._dbs)):
+            Handler().set_db(db)
+            Handler().set_scene(scene)
+            random.setstate(self._random_states[i][0])
+            np.random.set_state(self._random_states[i][1])
+            scene.update(self._config.FIXED_DT, self._arrays['actions'][env_id] if use_actions else None)
+            self._random_states[i] = (random.getstate(), np.random.get_state())
+        self._write()
+
+    def close(self) -> None:
+        self._close_scenes()
+        self._arrays = {}
+        for shm in self._shms:
+            shm.close()
+        self._shms = []
+
+    def _write(self) -> None:
+        # write observations of every scene to the shared buffers
+        if not self._arrays:
+            return
+        states, views = self._arrays['states'], self._arrays['views']
+        for env_id, scene in zip(self._env_ids, self._scenes):
+            fishes = scene.fishes
+            if len(fishes) != states.shape[1]:
+                raise ValueError(f"Scene {env_id} has {len(fishes)} fish, expected {states.shape[1]}")
+            states[env_id], views[env_id] = scene.observe(fishes)
+
+    def _close_scenes(self) -> None:
+        for scene in self._scenes:
+            scene.vision.close()
+        for db in self._dbs:
+            db.close()
+        self._scenes = []
+        self._dbs = []
+        self._random_states = []
+
+
+def _run_worker(conn: Connection, config_path: str, env_ids: range, seed: int = None) -> None:
+    """
+    Main loop of a worker process, running the commands received from the VectorEnv.
+
+    :param conn: connection to the main process
+    :param config_path: path to the config of the scenes
+    :param env_ids: indices of the scenes of this worker
+    :param seed: seed of the first scene
+    :return:
+    """
+    worker = None
+    try:
+        worker = _SceneWorker(config_path, env_ids, seed)
+        conn.send(('ok', worker.reset()))
+        while True:
+            command, data = conn.recv()
+            if command == 'close':
+                break
+            conn.send(('ok', getattr(worker, command)(data)))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    except Exception:
+        conn.send(('error', traceback.format_exc()))
+    finally:
+        if worker is not None:
+            worker.close()
+        conn.close()
@@ -1,20 +1,20 @@
 from __future__ import annotations
 
 import time
+from collections import defaultdict
 from enum import Enum
 
 import numpy as np
-import pygame
 from pygame import Vector2
 
 from cardumen import utils
 from cardumen.collision import Collider
-from cardumen.control import Agent
 from cardumen.database import Table
 from cardumen.entities import Entity
 from cardumen.geometry import PosRotScale, deg2rad, scale_points, rotate_points, move_points
 from cardumen.handler import Handler
 from cardumen.projection import Projection
+from cardumen.school import School, SchoolPosRotScale
 from cardumen.shapes import Polygon, ConvexQuad
 from cardumen.sprite import Sprite
 
@@ -42,27 +42,42 @@ class Swim(Enum):
         self._tilt_sign = tilt
         self._vel_multiplier = vel
 
-    def execute(self, fish: Fish, dt: float) -> None:
-        fish.prs.rot += self._tilt_sign * dt * fish.tilt_speed
-        fish.speed *= self._vel_multiplier
+    @classmethod
+    def table(cls) -> np.ndarray:
+        """
+        Get tilt sign and speed multiplier of every action, indexed by action id, for vectorized execution.
+
+        :return: array of shape (n_actions, 2)
+        """
+        table = np.zeros((len(cls), 2))
+        for action in cls:
+            table[action.id] = action._tilt_sign, action._vel_multiplier
+        return table
 
 
 class Fish(Entity):
+    """
+    Fish whose state is stored in a row of a School, so that the whole school can be moved at once.
+    Until it is added to the school of a scene, a fish is the only member of a private school.
+    Actions are chosen for the whole school by the Policy of the scene.
+    """
+
     def __init__(self, prs: PosRotScale, cat: int = 1):
         if not 1 <= cat <= 7:
             raise ValueError("cat must be in [1, 7]")
-        super().__init__(prs, Sprite(f"assets/fish{cat}.png", rot=deg2rad(-90), scale=.05))
+        super().__init__(SchoolPosRotScale.from_prs(prs),
+                         Sprite(f"assets/fish{cat}.png", rot=deg2rad(-90), scale=.05))
         self.cat = cat
+        self.prs.school.cat[self.prs.index] = cat
 
-        base_speed = 200
-        self.min_speed = base_speed * .25
-        self.max_speed = base_speed * 4
-        self.speed = base_speed
+        self.base_speed = 200
+        self.min_speed = self.base_speed * .25
+        self.max_speed = self.base_speed * 4
+        self.speed = self.base_speed
         self.tilt_speed = .5
-        self.vel = Vector2()
-        self.vel.from_polar((self.speed, -self.prs.rot_deg))
-
-        self._agent = Agent(len(list(Swim)))
+        vel = Vector2()
+        vel.from_polar((self.speed, -self.prs.rot_deg))
+        self.vel = vel
 
         # trapezoid view
         w, h = self.sprite.width, self.sprite.height
@@ -97,50 +112,138 @@ class Fish(Entity):
         self.sensor.on_collision_end = lambda \
                 _: self.sensor.poly.reset_color() if not self.sensor.is_colliding() else None
 
-        def add_to_detection_canvas(other: Collider):
-            for rep in utils.get_wraps():
-                poly2 = other.poly.clone_at(other.poly.prs.pos + rep)
-                poly2.prs = poly2.prs.relative_to(self.view.poly.prs)
-                body_surf, body_rect = poly2.get_surface(return_rect=True)
-                view_rect = utils.get_rect(self.view.poly.local_points)
-                topleft = Vector2(body_rect.topleft) - Vector2(view_rect.topleft)
-                self.view_detect.blit(body_surf, topleft)
-
-        self.view.on_collision = add_to_detection_canvas
-
-        self.view_detect = None
-        self.view_state = np.zeros((*self.view_projection.output_size, 3))
+        # view canvas in local coordinates, origin at the top left corner of the view bounding box
+        # drawn and projected into the view state by the scene VisionStage
+        view_rect = utils.get_rect(view.local_points)
+        self.view_origin = np.array(view_rect.topleft, dtype=float)
+        self.view_detect = np.zeros((view_rect.height, view_rect.width, 3), dtype=np.uint8)
+        self.view_state = np.zeros((*self.view_projection.output_size, 3), dtype=np.uint8)
 
         # database
         self.db_table = Table(Handler().db, f'fish{cat}', Handler().config.DATA_CONFIG)
         self.db_table.create()
 
-    def update(self, dt: float) -> None:
-        # choose action
-        label = self._agent.act(self.get_state())
-        action = Swim(label)
-        action.execute(self, dt)
-
-        # update position
-        self.speed = max(self.min_speed, min(self.max_speed, self.speed))
-        self.vel.from_polar((self.speed, -self.prs.rot_deg))
-        self.prs.pos += self.vel * dt
-
-        # update colliders
-        view_rect = utils.get_rect(self.view.poly.local_points)
-        self.view_detect = pygame.Surface(view_rect.size, pygame.SRCALPHA)
+    def late_update(self, dt: float) -> None:
+        # view state has been computed by the scene VisionStage
+        if self.view.is_colliding() and self.cat == 1 and Handler().config.plot_collider:
+            utils.plot_arr(self.view_state)
+
+        # update database, timestamped with simulated time in headless mode so that runs can be reproduced
+        timestamp = Handler().scene.time if Handler().config.HEADLESS else time.time()
+        self.db_table.add(timestamp, self.get_state())
+
+    def reset(self, prs: PosRotScale) -> None:
+        """
+        Reset fish to its initial state at a new transformation, so that it can be reused.
+        The PRS object is kept, since it is shared with the collider polygons.
+
+        :param prs: new position, rotation and scale
+        :return:
+        """
+        self.id = next(Entity._ids)  # a new fish, not interpolated from where it was released
+        self.prs.pos = prs.pos.copy()
+        self.prs.rot = prs.rot
+        self.prs.scale = prs.scale
+        self.speed = self.base_speed
+        vel = Vector2()
+        vel.from_polar((self.speed, -self.prs.rot_deg))
+        self.vel = vel
         for collider in self.colliders:
-            collider.update(dt)
-        if self.view.is_colliding() and self.cat == 1:
-            self.view_state = self.view_projection(utils.surf2arr(self.view_detect))
-            if Handler().config.plot_collider:
-                utils.plot_arr(self.view_state)
-
-        # update database
-        self.db_table.add(time.time(), self.get_state())
+            collider.poly.reset_color()
+        self.view_detect.fill(0)
+        self.view_state = np.zeros((*self.view_projection.output_size, 3), dtype=np.uint8)
 
     def get_state(self) -> list[np.ndarray]:
         return [np.array([*self.prs.pos, *self.vel]), self.view_state]
 
+    @property
+    def school(self) -> School:
+        return self.prs.school
+
+    @property
+    def action(self) -> int:
+        return int(self.prs.school.action[self.prs.index])
+
+    @action.setter
+    def action(self, action: int) -> None:
+        self.prs.school.action[self.prs.index] = action
+
+    @property
+    def speed(self) -> float:
+        return float(self.prs.school.speed[self.prs.index])
+
+    @speed.setter
+    def speed(self, speed: float) -> None:
+        self.prs.school.speed[self.prs.index] = speed
+
+    @property
+    def vel(self) -> Vector2:
+        return Vector2(*self.prs.school.vel[self.prs.index])
+
+    @vel.setter
+    def vel(self, vel: Vector2) -> None:
+        self.prs.school.vel[self.prs.index] = vel
+
+    @property
+    def min_speed(self) -> float:
+        return float(self.prs.school.min_speed[self.prs.index])
+
+    @min_speed.setter
+    def min_speed(self, speed: float) -> None:
+        self.prs.school.min_speed[self.prs.index] = speed
+
+    @property
+    def max_speed(self) -> float:
+        return float(self.prs.school.max_speed[self.prs.index])
+
+    @max_speed.setter
+    def max_speed(self, speed: float) -> None:
+        self.prs.school.max_speed[self.prs.index] = speed
+
+    @property
+    def tilt_speed(self) -> float:
+        return float(self.prs.school.tilt_speed[self.prs.index])
+
+    @tilt_speed.setter
+    def tilt_speed(self, speed: float) -> None:
+        self.prs.school.tilt_speed[self.prs.index] = speed
+
     def __repr__(self):
         return f'Fish(cat={self.cat})'
+
+
+class FishPool:
+    """
+    Pool of Fish instances.
+    Released fish are kept with their sprite, colliders, projection and database table,
+    and reused when a fish of the same category is acquired.
+    """
+
+    def __init__(self):
+        self._free = defaultdict(list)  # cat -> list of fish
+
+    def acquire(self, prs: PosRotScale, cat: int = 1) -> Fish:
+        """
+        Get a fish, recycled if possible.
+
+        :param prs: position, rotation and scale of the fish
+        :param cat: category of the fish
+        :return: fish
+        """
+        if self._free[cat]:
+            fish = self._free[cat].pop()
+            fish.reset(prs)
+            return fish
+        return Fish(prs, cat=cat)
+
+    def release(self, fish: Fish) -> None:
+        """
+        Return a fish to the pool. The fish must have been removed from the scene.
+
+        :param fish: fish
+        :return:
+        """
+        self._free[fish.cat].append(fish)
+
+    def __len__(self) -> int:
+        return sum(len(free) for free in self._free.values())
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import math
 
+import numpy as np
 from pygame import Vector2
 
 
@@ -64,6 +65,9 @@ def move_points(points: list[Vector2], offset: Vector2) -> list[Vector2]:
 class PosRotScale:
     """
     Class to represent position, rotation and scale of an object.
+    Every assignment of pos, rot or scale increments the version counter,
+    so that objects depending on the transformation can cache derived values.
+    In-place changes of the pos vector components do not increment the version, assign pos instead.
     """
 
     def __init__(self, pos: Vector2 = Vector2(0, 0), rot: float = 0, scale: float = 1):
@@ -74,10 +78,39 @@ class PosRotScale:
         :param rot: rotation of the object, in radians, positive counterclockwise
         :param scale: scale of the object
         """
+        self.version = 0
         self.pos = pos
         self.rot = rot
         self.scale = scale
 
+    @property
+    def pos(self) -> Vector2:
+        return self._pos
+
+    @pos.setter
+    def pos(self, pos: Vector2) -> None:
+        self._pos = pos
+        self.version += 1
+
+    @property
+    def rot(self) -> float:
+        return self._rot
+
+    @rot.setter
+    def rot(self, rot: float) -> None:
+        self._rot = rot
+        self._trig = None  # (cos, sin, deg), computed lazily
+        self.version += 1
+
+    @property
+    def scale(self) -> float:
+        return self._scale
+
+    @scale.setter
+    def scale(self, scale: float) -> None:
+        self._scale = scale
+        self.version += 1
+
     def clone(self) -> PosRotScale:
         """
         Create a copy of this object.
@@ -100,6 +133,19 @@ class PosRotScale:
             self.scale / other.scale
         )
 
+    def to_local(self, points: np.ndarray) -> np.ndarray:
+        """
+        Transform points from global coordinates to the local coordinates of this object.
+        Same transformation as relative_to, applied to an array of points.
+
+        :param points: points in global coordinates, shape (n, 2)
+        :return: points in local coordinates, shape (n, 2)
+        """
+        c, s = self.cos, self.sin
+        dx = points[:, 0] - self.pos.x
+        dy = points[:, 1] - self.pos.y
+        return np.stack([dx * c - dy * s, dx * s + dy * c], axis=1) / self.scale
+
     @property
     def rot_deg(self) -> float:
         """
@@ -107,7 +153,30 @@ class PosRotScale:
 
         :return: rotation angle
         """
-        return rad2deg(self.rot)
+        return self._get_trig()[2]
+
+    @property
+    def cos(self) -> float:
+        """
+        Cosine of the rotation, cached until the rotation changes.
+
+        :return: cosine
+        """
+        return self._get_trig()[0]
+
+    @property
+    def sin(self) -> float:
+        """
+        Sine of the rotation, cached until the rotation changes.
+
+        :return: sine
+        """
+        return self._get_trig()[1]
+
+    def _get_trig(self) -> tuple[float, float, float]:
+        if self._trig is None:
+            self._trig = (math.cos(self._rot), math.sin(self._rot), rad2deg(self._rot))
+        return self._trig
 
     def __eq__(self, other):
         return self.pos == other.pos and self.rot == other.rot and self.scale == other.scale
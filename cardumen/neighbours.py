@@ -0,0 +1,162 @@
+"""
+Neighbour queries between fish, for schooling and shoaling behaviours.
+"""
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+
+class NeighbourIndex:
+    """
+    Cell list over the points of a school, rebuilt once per tick.
+    Points are sorted by cell, so that the points of any cell are a contiguous range of the sorted order,
+    and queries gather the candidates of all neighbouring cells with a few array operations.
+    If the world wraps around, cells and distances are periodic (minimum image).
+    Bearings are measured from the heading of the querying point, positive counterclockwise, in [-pi, pi).
+    """
+
+    def __init__(self, world_size: tuple[float, float], cell_size: float, wrap: bool = True):
+        """
+        Create an empty index.
+        The cell size is adjusted so that an integer number of cells fits in the world.
+
+        :param world_size: width and height of the world
+        :param cell_size: approximate side length of a cell, best close to the usual query radius
+        :param wrap: whether the world is toroidal
+        """
+        width, height = world_size
+        self._size = np.array([width, height], dtype=float)
+        self._n_cells = np.array([max(1, int(width // cell_size)), max(1, int(height // cell_size))])
+        self._cell = self._size / self._n_cells
+        self._wrap = wrap
+        self.build(np.zeros((0, 2)))
+
+    def __len__(self) -> int:
+        return len(self.pos)
+
+    def build(self, pos: np.ndarray, rot: np.ndarray = None) -> None:
+        """
+        Index the given points.
+
+        :param pos: positions, shape (n, 2)
+        :param rot: rotations, in radians, shape (n,), bearings are absolute if not given
+        :return:
+        """
+        self.pos = np.array(pos, dtype=float).reshape(-1, 2)
+        self.rot = np.zeros(len(self.pos)) if rot is None else np.array(rot, dtype=float)
+        self._x, self._y = self.pos[:, 0].copy(), self.pos[:, 1].copy()
+        cells = np.floor(self.pos / self._cell).astype(int)
+        cells = cells % self._n_cells if self._wrap else np.clip(cells, 0, self._n_cells - 1)
+        self._cells = cells
+        cell_ids = cells[:, 0] * self._n_cells[1] + cells[:, 1]
+        self._order = np.argsort(cell_ids, kind='stable')
+        counts = np.bincount(cell_ids, minlength=int(np.prod(self._n_cells)))
+        self._starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        self._counts = counts
+
+    def query_radius(self, radius: float, queries: np.ndarray = None
+                     ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get all pairs of indexed points closer than a radius, excluding each point itself.
+        Pairs are grouped by query point, in the order of the queries.
+
+        :param radius: search radius
+        :param queries: indices of the query points, all points by default
+        :return: query index, neighbour index, distance and bearing of each pair, shape (m,) each
+        """
+        queries = np.arange(len(self.pos)) if queries is None else np.asarray(queries, dtype=int)
+        i, j = self._candidates(queries, radius)
+        dx, dy = self._displacement(i, j)
+        dist2 = dx * dx + dy * dy
+        keep = (dist2 <= radius * radius) & (i != j)
+        i, j, dx, dy = i[keep], j[keep], dx[keep], dy[keep]
+        return i, j, np.sqrt(dist2[keep]), self._bearing(i, dx, dy)
+
+    def query_knn(self, k: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get the k nearest neighbours of every indexed point, excluding the point itself.
+        The search radius grows until every point has k neighbours or covers the whole world.
+        Points with fewer than k neighbours are padded with index -1, distance inf and bearing nan.
+
+        :param k: number of neighbours
+        :return: neighbour indices, distances and bearings, shape (n, k) each, sorted by distance
+        """
+        n = len(self.pos)
+        indices = np.full((n, k), -1, dtype=int)
+        distances = np.full((n, k), np.inf)
+        bearings = np.full((n, k), np.nan)
+        max_radius = float(np.hypot(*(self._size / 2 if self._wrap else self._size)))
+        # start where 2k neighbours are expected for uniformly spread points
+        radius = min(max_radius, math.sqrt(2 * k * float(np.prod(self._size)) / (math.pi * max(n - 1, 1))))
+        pending = np.arange(n)
+        while len(pending) and k > 0:
+            i, j, dist, bearing = self.query_radius(radius, pending)
+            sort = np.lexsort((dist, i))
+            i, j, dist, bearing = i[sort], j[sort], dist[sort], bearing[sort]
+            counts = np.bincount(i, minlength=n)[pending]
+            done = pending[(counts >= k) | (radius >= max_radius)]
+            # rank of each pair within its query point, pairs are sorted by distance
+            first = np.searchsorted(i, i)
+            rank = np.arange(len(i)) - first
+            mask = np.isin(i, done) & (rank < k)
+            indices[i[mask], rank[mask]] = j[mask]
+            distances[i[mask], rank[mask]] = dist[mask]
+            bearings[i[mask], rank[mask]] = bearing[mask]
+            pending = np.setdiff1d(pending, done)
+            radius = min(2 * radius, max_radius)
+        return indices, distances, bearings
+
+    def _candidates(self, queries: np.ndarray, radius: float) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get every point in the cells within reach of the query points.
+
+        :param queries: indices of the query points
+        :param radius: search radius
+        :return: query and candidate indices of each pair
+        """
+        reach = np.ceil(radius / self._cell).astype(int)
+        offsets = []
+        for axis in range(2):
+            if self._wrap and 2 * reach[axis] + 1 >= self._n_cells[axis]:
+                # the whole axis is within reach, visit every cell once
+                offsets.append(np.arange(self._n_cells[axis]))
+            else:
+                offsets.append(np.arange(-reach[axis], reach[axis] + 1))
+        ox, oy = (o.ravel() for o in np.meshgrid(*offsets, indexing='ij'))
+
+        cells = self._cells[queries]
+        cx = cells[:, 0, None] + ox
+        cy = cells[:, 1, None] + oy
+        if self._wrap:
+            valid = np.ones(cx.shape, dtype=bool)
+            cx, cy = cx % self._n_cells[0], cy % self._n_cells[1]
+        else:
+            valid = (cx >= 0) & (cx < self._n_cells[0]) & (cy >= 0) & (cy < self._n_cells[1])
+            cx, cy = np.clip(cx, 0, self._n_cells[0] - 1), np.clip(cy, 0, self._n_cells[1] - 1)
+        cell_ids = cx * self._n_cells[1] + cy
+        counts = np.where(valid, self._counts[cell_ids], 0).ravel()
+        starts = self._starts[cell_ids].ravel()
+
+        # expand every (query, cell) into the points of the cell
+        total = counts.sum()
+        i = np.repeat(np.repeat(queries, cx.shape[1]), counts)
+        within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        j = self._order[np.repeat(starts, counts) + within]
+        return i, j
+
+    def _displacement(self, i: np.ndarray, j: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        dx = self._x[j] - self._x[i]
+        dy = self._y[j] - self._y[i]
+        if self._wrap:
+            # points are inside the world, so a single wrap gives the minimum image
+            width, height = self._size
+            dx -= width * ((dx > width / 2).astype(float) - (dx < -width / 2))
+            dy -= height * ((dy > height / 2).astype(float) - (dy < -height / 2))
+        return dx, dy
+
+    def _bearing(self, i: np.ndarray, dx: np.ndarray, dy: np.ndarray) -> np.ndarray:
+        # the y axis points down, angles are counterclockwise on screen, same as PosRotScale.rot
+        angle = np.arctan2(-dy, dx) - self.rot[i]
+        return (angle + math.pi) % (2 * math.pi) - math.pi
@@ -4,20 +4,70 @@ import cv2
 import numpy as np
 from pygame import Vector2
 
-from cardumen import utils
+from cardumen import raster, utils
 from cardumen.shapes import ConvexQuad
 
 
 class Projection:
+    # Projections shared by all views with the same geometry, see from_convex_quad
+    _CACHE = {}
+
     def __init__(self, src_points: list[Vector2], output_size: tuple[int, int]):
         self.output_size = int(output_size[0]), int(output_size[1])
+        self._src_points = np.array(src_points, dtype=float)
 
         # Compute the projective transformation matrix
         self._M = Projection._homography(src_points, self.output_size)
+        self._map1, self._map2 = Projection._remap_tables(self._M, self.output_size)
+        # homography is defined up to scale, make the homogeneous coordinate positive inside the source quad
+        w = self._src_points @ self._M[2, :2] + self._M[2, 2]
+        if np.min(w) < 0:
+            self._M = -self._M
+            w = -w
+        self._horizon_margin = .5 * np.min(w)
+
+    def __call__(self, arr: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        # Apply the projective transformation, optionally into a preallocated output
+        # approximately cv2.warpPerspective, without recomputing the source coordinates of every pixel
+        # the fixed-point maps round sub-pixel offsets to 1/32 px, values differ by up to 8 levels at sharp edges
+        return cv2.remap(arr, self._map1, self._map2, cv2.INTER_LINEAR, dst=out)
+
+    def project_points(self, points: np.ndarray) -> np.ndarray:
+        """
+        Apply the projective transformation to points in source coordinates.
+        Points must be in front of the horizon of the transformation (see project_polygons).
+
+        :param points: points in source coordinates, shape (n, 2)
+        :return: points in output coordinates, shape (n, 2)
+        """
+        homogeneous = points @ self._M[:, :2].T + self._M[:, 2]
+        return homogeneous[:, :2] / homogeneous[:, 2:]
+
+    def project_polygons(self, polygons: list[np.ndarray], colors: list[tuple], out: np.ndarray = None) -> np.ndarray:
+        """
+        Analytic alternative to rasterizing polygons in source coordinates and then warping the image.
+        Each convex polygon is clipped against the horizon of the transformation, transformed and rasterized directly
+        at the output size. Parts outside the source quad fall outside the output image and are not drawn.
 
-    def __call__(self, arr: np.ndarray) -> np.ndarray:
-        # Apply the projective transformation
-        return cv2.warpPerspective(arr, self._M, self.output_size)
+        :param polygons: convex polygons in source coordinates, each of shape (n, 2)
+        :param colors: color of each polygon, one value per channel
+        :param out: output image of shape (height, width, channels), filled in place, optional
+        :return: output image
+        """
+        width, height = self.output_size
+        if out is None:
+            out = np.zeros((height, width, 3), dtype=np.uint8)
+        else:
+            out.fill(0)
+        # points beyond the horizon line (where the homogeneous coordinate vanishes) would be mirrored,
+        # polygons are clipped to the side of the source quad, the rest of clipping happens when rasterizing
+        horizon = self._M[2] - self._horizon_margin * np.array([0, 0, 1])
+        for points, color in zip(polygons, colors):
+            clipped = raster.clip_half_plane(np.asarray(points, dtype=float), horizon)
+            if len(clipped) < 3:
+                continue
+            raster.fill_convex_polygon(out, self.project_points(clipped), color)
+        return out
 
     @staticmethod
     def _homography(src_points: list[Vector2], output_size: tuple[int, int]) -> np.ndarray:
@@ -26,8 +76,31 @@ class Projection:
         H, _ = cv2.findHomography(np.array(src_points), dst_points)
         return H
 
+    @staticmethod
+    def _remap_tables(M: np.ndarray, output_size: tuple[int, int]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Precompute the source coordinates of every output pixel, in the fixed-point format of cv2.remap.
+
+        :param M: projective transformation matrix, from source to output
+        :param output_size: width and height of the output
+        :return: maps to be passed to cv2.remap
+        """
+        width, height = output_size
+        u, v = np.meshgrid(np.arange(width, dtype=float), np.arange(height, dtype=float))
+        src = np.stack([u, v, np.ones_like(u)], axis=-1) @ np.linalg.inv(M).T
+        map_x = (src[..., 0] / src[..., 2]).astype(np.float32)
+        map_y = (src[..., 1] / src[..., 2]).astype(np.float32)
+        return cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)
+
     @classmethod
     def from_convex_quad(cls, poly: ConvexQuad) -> Projection:
+        """
+        Get the projection of the quad to a square, in the local coordinates of the quad.
+        Projections are cached, quads with the same geometry share the same instance.
+
+        :param poly: convex quad
+        :return: projection
+        """
         if not isinstance(poly, ConvexQuad):
             raise TypeError("poly must be a ConvexQuad")
 
@@ -37,4 +110,7 @@ class Projection:
         # define projection to square
         rect = utils.get_rect(points)
         points = [Vector2(p[0] - rect.x, p[1] - rect.y) for p in points]
-        return cls(points, output_size=(max_side, max_side))
+        key = (tuple((round(p.x, 6), round(p.y, 6)) for p in points), int(max_side))
+        if key not in cls._CACHE:
+            cls._CACHE[key] = cls(points, output_size=(max_side, max_side))
+        return cls._CACHE[key]
@@ -0,0 +1,66 @@
+"""
+Rasterization of polygons into NumPy image buffers, without pygame surfaces.
+Buffers are indexed as (row, column, channel), i.e. (y, x, channel).
+"""
+import numpy as np
+
+
+def fill_convex_polygon(buffer: np.ndarray, points: np.ndarray, color: tuple) -> None:
+    """
+    Fill a convex polygon in place, scanline by scanline.
+    Each edge bounds the filled span of a row from the left or from the right (half-space test).
+    As in pygame.draw.polygon, pixel (x, y) sits at integer coordinates and pixels on the boundary are filled.
+
+    :param buffer: image of shape (height, width, channels), modified in place
+    :param points: polygon points in pixel coordinates, shape (n, 2)
+    :param color: color of the polygon, one value per channel
+    :return:
+    """
+    height, width = buffer.shape[:2]
+    points = np.asarray(points, dtype=float)
+    x0, y0 = np.maximum(np.ceil(points.min(axis=0)), 0).astype(int)
+    x1, y1 = np.minimum(np.floor(points.max(axis=0)) + 1, (width, height)).astype(int)
+    if x0 >= x1 or y0 >= y1:
+        return
+
+    # orient edges so that the inside is on the left: ex * (y - py) - ey * (x - px) >= 0
+    edges = points[np.r_[1:len(points), 0]] - points
+    if np.sum(points[:, 0] * edges[:, 1] - points[:, 1] * edges[:, 0]) < 0:
+        edges = -edges
+    eps = 1e-9 * np.hypot(edges[:, 0], edges[:, 1])
+    ys = np.arange(y0, y1)
+    # per row and edge: ey * x <= ex * (y - py) + ey * px + eps
+    rhs = edges[:, 0, None] * (ys[None] - points[:, 1, None]) + (edges[:, 1] * points[:, 0] + eps)[:, None]
+    ey = edges[:, 1, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bound = rhs / ey
+    left = np.max(np.where(ey < 0, bound, -np.inf), axis=0)
+    right = np.min(np.where(ey > 0, bound, np.inf), axis=0)
+    # horizontal edges keep or discard whole rows
+    rows = np.all((ey != 0) | (rhs >= 0), axis=0)
+
+    xs = np.arange(x0, x1)
+    inside = (xs[None] >= left[:, None]) & (xs[None] <= right[:, None]) & rows[:, None]
+    np.copyto(buffer[y0:y1, x0:x1], np.asarray(color, dtype=buffer.dtype), where=inside[..., None])
+
+
+def clip_half_plane(points: np.ndarray, line: np.ndarray) -> np.ndarray:
+    """
+    Clip a polygon to the half-plane a*x + b*y + c >= 0 (one Sutherland-Hodgman step).
+
+    :param points: polygon to clip, shape (n, 2)
+    :param line: coefficients (a, b, c) of the half-plane
+    :return: points of the clipped polygon, shape (k, 2)
+    """
+    side = points @ line[:2] + line[2]
+    if np.all(side >= 0):
+        return points
+    output = []
+    for i in range(len(points)):
+        j = (i + 1) % len(points)
+        if side[i] >= 0:
+            output.append(points[i])
+        if (side[i] >= 0) != (side[j] >= 0):
+            t = side[i] / (side[i] - side[j])
+            output.append(points[i] + t * (points[j] - points[i]))
+    return np.array(output, dtype=float).reshape(-1, 2)
@@ -0,0 +1,135 @@
+"""
+Recording of rendered frames to a video file or to chunks of raw frames, off the render loop.
+"""
+from __future__ import annotations
+
+import os
+import queue
+import threading
+
+import cv2
+import numpy as np
+import pygame
+
+from cardumen.logger import log
+
+
+class FrameRecorder:
+    """
+    Copies rendered frames into a pool of preallocated buffers, encoded by a background writer thread.
+    Capturing a frame is a single copy, so the render loop never waits for the encoder, unless the policy is 'block'
+    and every buffer is still waiting to be written. With the 'drop' policy, frames are skipped instead.
+    Frames are written to a video with cv2.VideoWriter, or, if the path has no video extension, to a directory
+    of .npy files of chunk_size frames each, shape (frames, height, width, 3), RGB.
+    """
+    VIDEO_CODECS = {'.mp4': 'mp4v', '.avi': 'MJPG'}
+
+    def __init__(self, path: str, size: tuple[int, int], fps: float, pool_size: int = 8, policy: str = 'drop',
+                 chunk_size: int = 256):
+        """
+        Create the buffer pool and start the writer thread.
+
+        :param path: video file, .mp4 or .avi, or directory of .npy chunks
+        :param size: width and height of the frames
+        :param fps: frame rate of the video
+        :param pool_size: number of frame buffers, i.e. maximum number of frames waiting to be written
+        :param policy: 'drop' to skip frames or 'block' to wait when every buffer is in use
+        :param chunk_size: number of frames per .npy chunk
+        """
+        if policy not in ('drop', 'block'):
+            raise ValueError(f"Unknown recording policy: {policy}")
+        self.path = path
+        self.size = (int(size[0]), int(size[1]))
+        self.fps = fps
+        self.policy = policy
+        self.chunk_size = chunk_size
+        self.captured = 0
+        self.dropped = 0
+
+        width, height = self.size
+        self._free = queue.Queue()
+        for _ in range(max(1, pool_size)):
+            self._free.put(np.empty((height, width, 3), dtype=np.uint8))
+        self._frames = queue.Queue()  # filled buffers, bounded by the pool, None to stop
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run_writer, daemon=True)
+        self._thread.start()
+
+    def capture(self, surface: pygame.Surface) -> bool:
+        """
+        Copy a frame to be recorded.
+
+        :param surface: rendered surface, of the size of the recorder
+        :return: True if the frame was queued, False if it was dropped or recording is disabled after an error
+        """
+        if self._closed:
+            return False
+        if self._error is not None:
+            # recording stops, rendering goes on
+            log.error(f"Recording disabled, frame writer failed: {self._error}")
+            self.close()
+            return False
+        try:
+            buffer = self._free.get(block=self.policy == 'block')
+        except queue.Empty:
+            self.dropped += 1
+            return False
+        # pixels3d is indexed (x, y), the buffer (y, x) as images
+        np.copyto(buffer, pygame.surfarray.pixels3d(surface).transpose(1, 0, 2))
+        self._frames.put(buffer)
+        self.captured += 1
+        return True
+
+    def close(self) -> None:
+        """
+        Write the remaining frames and close the file.
+
+        :return:
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._frames.put(None)
+        self._thread.join()
+        log.info(f"Recorded {self.captured} frames to {self.path}, {self.dropped} dropped")
+
+    def _run_writer(self) -> None:
+        ext = os.path.splitext(self.path)[1].lower()
+        writer = None
+        chunk = None
+        n_frames = 0  # in the current chunk
+        n_chunks = 0
+        try:
+            if ext in self.VIDEO_CODECS:
+                writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.VIDEO_CODECS[ext]), self.fps,
+                                         self.size)
+                if not writer.isOpened():
+                    raise IOError(f"Cannot open video writer for {self.path}")
+            else:
+                os.makedirs(self.path, exist_ok=True)
+                chunk = np.empty((self.chunk_size, self.size[1], self.size[0], 3), dtype=np.uint8)
+            while True:
+                buffer = self._frames.get()
+                if buffer is None:
+                    break
+                if writer is not None:
+                    writer.write(cv2.cvtColor(buffer, cv2.COLOR_RGB2BGR))
+                else:
+                    chunk[n_frames] = buffer
+                    n_frames += 1
+                self._free.put(buffer)
+                if n_frames == self.chunk_size:
+                    np.save(os.path.join(self.path, f'frames_{n_chunks:05d}.npy'), chunk)
+                    n_frames = 0
+                    n_chunks += 1
+            if n_frames:
+                np.save(os.path.join(self.path, f'frames_{n_chunks:05d}.npy'), chunk[:n_frames])
+        except Exception as e:
+            log.error(f"Frame writer failed: {e}")
+            self._error = e
+            # release the render loop if it is blocked on the pool
+            self._free.put(np.empty((self.size[1], self.size[0], 3), dtype=np.uint8))
+        finally:
+            if writer is not None:
+                writer.release()
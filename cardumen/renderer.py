@@ -0,0 +1,313 @@
+"""
+Renderer running in its own process, fed with scene snapshots through shared memory.
+"""
+from __future__ import annotations
+
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+from multiprocessing.synchronize import Event
+
+import numpy as np
+import pygame
+
+from cardumen.config import Config
+from cardumen.display import Display
+from cardumen.handler import Handler
+from cardumen.logger import log
+from cardumen.snapshot import Snapshot, SnapshotBuffer
+from cardumen.sprite import Sprite
+
+
+class SnapshotRing:
+    """
+    Ring of snapshot slots in shared memory, written by one process and read by another.
+    Every slot holds one snapshot in fixed-capacity arrays. Each write goes to the next slot, which is marked
+    as being written until it is complete, and a reader checks that mark before and after copying a slot,
+    so the writer never waits for the reader and the reader never uses a torn snapshot.
+    Sprites are referenced by index, their keys are sent separately.
+    """
+
+    def __init__(self, capacity: int, slots: int = 3, name: str = None):
+        """
+        Create the ring, or attach to an existing one if a name is given.
+
+        :param capacity: maximum number of entities per snapshot, polygons and vertices are sized after it
+        :param slots: number of slots
+        :param name: name of the shared memory to attach to
+        """
+        self.capacity = capacity
+        self.slots = slots
+        self._layout = [
+            ('seq', (), np.int64),  # sequence number of the snapshot, -1 while being written
+            ('counts', (3,), np.int64),  # entities, polygons, vertices
+            ('meta', (5,), np.float64),  # time, stamp, debug, world width, world height (0 if not wrapped)
+            ('ids', (capacity,), np.int64),
+            ('pos', (capacity, 2), np.float64),
+            ('rot', (capacity,), np.float64),
+            ('scale', (capacity,), np.float64),
+            ('cat', (capacity,), np.int64),
+            ('sprite', (capacity,), np.int64),
+            ('wrap', (capacity,), np.bool_),
+            ('static', (capacity,), np.bool_),
+            ('poly_row', (4 * capacity,), np.int64),
+            ('poly_start', (4 * capacity + 1,), np.int64),
+            ('poly_color', (4 * capacity, 8), np.uint8),
+            ('vertices', (32 * capacity, 2), np.float64),
+        ]
+        slot_size = sum(self._aligned(np.prod(shape, dtype=int) * np.dtype(dtype).itemsize)
+                        for _, shape, dtype in self._layout)
+        size = 8 + slots * slot_size
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+            self._owner = True
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+        self.name = self._shm.name
+
+        self._latest = np.ndarray((), dtype=np.int64, buffer=self._shm.buf)
+        self._slots = []
+        offset = 8
+        for _ in range(slots):
+            arrays = {}
+            for field, shape, dtype in self._layout:
+                arrays[field] = np.ndarray(shape, dtype=dtype, buffer=self._shm.buf, offset=offset)
+                offset += self._aligned(np.prod(shape, dtype=int) * np.dtype(dtype).itemsize)
+            self._slots.append(arrays)
+        if self._owner:
+            self._latest[()] = 0
+            for arrays in self._slots:
+                arrays['seq'][()] = 0
+        self._truncated = False
+
+    @staticmethod
+    def _aligned(size: int) -> int:
+        return (int(size) + 7) // 8 * 8
+
+    @property
+    def latest(self) -> int:
+        """
+        Sequence number of the last complete snapshot, 0 if none.
+
+        :return: sequence number
+        """
+        return int(self._latest[()])
+
+    def write(self, snapshot: Snapshot, sprites: np.ndarray) -> None:
+        """
+        Write a snapshot into the next slot. Entities and polygons beyond the capacity are dropped.
+
+        :param snapshot: snapshot
+        :param sprites: index of the sprite of each entity
+        :return:
+        """
+        seq = self.latest + 1
+        slot = self._slots[seq % self.slots]
+        slot['seq'][()] = -1
+
+        n = min(len(snapshot), self.capacity)
+        polygons = [polygon for polygon in snapshot.polygons if polygon[0] < n][:len(slot['poly_row'])]
+        sizes = np.array([len(vertices) for _, vertices, _, _ in polygons], dtype=np.int64)
+        starts = np.concatenate([[0], np.cumsum(sizes)])
+        while len(starts) > 1 and starts[-1] > len(slot['vertices']):
+            polygons, sizes, starts = polygons[:-1], sizes[:-1], starts[:-1]
+        if (n < len(snapshot) or len(polygons) < len(snapshot.polygons)) and not self._truncated:
+            log.warning(f"Snapshot does not fit in renderer capacity {self.capacity}, some entities are not drawn")
+            self._truncated = True
+
+        slot['ids'][:n] = snapshot.ids[:n]
+        slot['pos'][:n] = snapshot.pos[:n]
+        slot['rot'][:n] = snapshot.rot[:n]
+        slot['scale'][:n] = snapshot.scale[:n]
+        slot['cat'][:n] = snapshot.cat[:n]
+        slot['sprite'][:n] = sprites[:n]
+        slot['wrap'][:n] = snapshot.wrap[:n]
+        slot['static'][:n] = snapshot.static[:n]
+        m = len(polygons)
+        if m:
+            slot['poly_row'][:m] = [row for row, _, _, _ in polygons]
+            slot['poly_start'][:m + 1] = starts
+            slot['poly_color'][:m] = [self._pad(fill) + self._pad(line) for _, _, fill, line in polygons]
+            slot['vertices'][:starts[-1]] = np.concatenate([vertices for _, vertices, _, _ in polygons])
+        world_w, world_h = snapshot.world_size if snapshot.world_size is not None else (0, 0)
+        slot['counts'][:] = n, m, starts[-1]
+        slot['meta'][:] = snapshot.time, snapshot.stamp, snapshot.debug, world_w, world_h
+
+        slot['seq'][()] = seq
+        self._latest[()] = seq
+
+    def read(self, sprites: dict[int, Sprite]) -> tuple[int, Snapshot | None]:
+        """
+        Copy the last complete snapshot out of the ring.
+
+        :param sprites: sprite of each sprite index
+        :return: sequence number and snapshot, None if there is none, it was overwritten while reading
+                 or one of its sprites has not been received yet
+        """
+        seq = self.latest
+        if seq == 0:
+            return seq, None
+        slot = self._slots[seq % self.slots]
+        if slot['seq'][()] != seq:
+            return seq, None
+        n, m, _ = (int(c) for c in slot['counts'])
+        time_, stamp, debug, world_w, world_h = slot['meta'].tolist()
+        ids = slot['ids'][:n].copy()
+        pos = slot['pos'][:n].copy()
+        rot = slot['rot'][:n].copy()
+        scale = slot['scale'][:n].copy()
+        cat = slot['cat'][:n].copy()
+        sprite_ids = slot['sprite'][:n].tolist()
+        wrap = slot['wrap'][:n].copy()
+        static = slot['static'][:n].copy()
+        rows = slot['poly_row'][:m].tolist()
+        starts = slot['poly_start'][:m + 1].tolist()
+        colors = slot['poly_color'][:m].tolist()
+        vertices = slot['vertices'][:starts[-1] if m else 0].copy()
+        if slot['seq'][()] != seq or any(i not in sprites for i in sprite_ids):
+            return seq, None
+
+        polygons = tuple((row, vertices[start:end], tuple(color[:4]), tuple(color[4:]))
+                         for row, start, end, color in zip(rows, starts[:-1], starts[1:], colors))
+        snapshot = Snapshot(time_, ids, pos, rot, scale, cat, tuple(sprites[i] for i in sprite_ids), wrap,
+                            polygons, bool(debug), (world_w, world_h) if world_w > 0 else None, static)
+        snapshot.stamp = stamp
+        return seq, snapshot
+
+    def close(self) -> None:
+        self._latest = None
+        self._slots = []
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    @staticmethod
+    def _pad(color: tuple) -> list[int]:
+        return [*color[:4], *[255] * (4 - len(color))]
+
+
+class RendererProcess:
+    """
+    Display running in a separate process, so that drawing never competes with the simulation for the GIL.
+    The simulation publishes snapshots into a SnapshotRing, and never waits for the renderer.
+    The renderer draws the latest snapshots at its own FPS, interpolated as in the render thread.
+    """
+
+    def __init__(self, config_path: str, capacity: int = 1024):
+        """
+        Create the shared snapshot ring. The process is started with start.
+
+        :param config_path: path to the config, loaded again by the renderer process
+        :param capacity: maximum number of entities drawn
+        """
+        context = mp.get_context('spawn')
+        self._ring = SnapshotRing(capacity)
+        self._sprite_queue = context.Queue()  # (index, key) of each new sprite, sent once
+        self._sprite_index = {}  # id(sprite) -> (sprite, index), the sprite is kept so that its id is not reused
+        self._sprite_keys = {}  # key -> index
+        self._stop = context.Event()
+        self._closed = context.Event()
+        self._process = context.Process(target=_run_renderer, daemon=True,
+                                        args=(config_path, self._ring.name, capacity, self._sprite_queue,
+                                              self._stop, self._closed))
+
+    def start(self) -> None:
+        self._process.start()
+
+    @property
+    def closed(self) -> bool:
+        """
+        Whether the renderer window was closed by the user.
+
+        :return: True if closed
+        """
+        return self._closed.is_set()
+
+    def publish(self, snapshot: Snapshot) -> None:
+        """
+        Send a snapshot to the renderer. Never blocks.
+
+        :param snapshot: snapshot
+        :return:
+        """
+        sprites = np.empty(len(snapshot), dtype=np.int64)
+        for row, sprite in enumerate(snapshot.sprites):
+            entry = self._sprite_index.get(id(sprite))
+            if entry is None:
+                key = sprite.key
+                if key not in self._sprite_keys:
+                    self._sprite_keys[key] = len(self._sprite_keys)
+                    self._sprite_queue.put((self._sprite_keys[key], key))
+                entry = self._sprite_index[id(sprite)] = (sprite, self._sprite_keys[key])
+            sprites[row] = entry[1]
+        self._ring.write(snapshot, sprites)
+
+    def close(self) -> None:
+        """
+        Stop the renderer process and release the shared memory.
+
+        :return:
+        """
+        self._stop.set()
+        if self._process.is_alive():
+            self._process.join(timeout=10)
+            if self._process.is_alive():
+                self._process.terminate()
+        self._sprite_queue.close()
+        self._ring.close()
+
+
+def _run_renderer(config_path: str, ring_name: str, capacity: int, sprite_queue: mp.Queue, stop: Event,
+                  closed: Event) -> None:
+    """
+    Main loop of the renderer process.
+    On each iteration, new sprites are loaded, the last snapshot is read from the ring and the scene is drawn.
+
+    :param config_path: path to the config
+    :param ring_name: name of the shared memory of the SnapshotRing
+    :param capacity: capacity of the ring
+    :param sprite_queue: queue of (index, key) of new sprites
+    :param stop: set by the simulation process to stop the renderer
+    :param closed: set by the renderer when its window is closed
+    :return:
+    """
+    config = Config(config_path)
+    Handler().set_config(config)
+    pygame.init()
+    display = Display(config.WINDOW_SIZE)
+    ring = SnapshotRing(capacity, name=ring_name)
+    sprites = {}
+    snapshots = SnapshotBuffer()
+    last_seq = 0
+    clock = pygame.time.Clock()
+    try:
+        while not stop.is_set():
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                    closed.set()
+                    return
+            while True:
+                try:
+                    index, key = sprite_queue.get_nowait()
+                except queue.Empty:
+                    break
+                sprites[index] = Sprite(*key)
+
+            if ring.latest != last_seq:
+                seq, snapshot = ring.read(sprites)
+                if snapshot is not None:
+                    snapshots.publish(snapshot)
+                    last_seq = seq
+            if config.INTERPOLATE:
+                snapshot = snapshots.at(time.perf_counter() - 1 / config.UPDATE_RATE)
+            else:
+                snapshot = snapshots.latest()
+            if snapshot is not None:
+                display.draw_snapshot(snapshot)
+            clock.tick(config.FPS)
+    finally:
+        display.close()
+        ring.close()
+        pygame.quit()
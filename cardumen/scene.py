@@ -1,47 +1,169 @@
 from collections import defaultdict
 from random import random
 
+import numpy as np
 from pygame import Vector2
 
+from cardumen.collision import CollisionWorld
+from cardumen.control import Agent, MLPPolicy, Policy
 from cardumen.display import Display
-from cardumen.entities import WaterBg
-from cardumen.fish import Fish
+from cardumen.entities import Entity, WaterBg
+from cardumen.fish import Fish, FishPool, Swim
 from cardumen.geometry import PosRotScale
 from cardumen.handler import Handler
+from cardumen.neighbours import NeighbourIndex
+from cardumen.school import School
+from cardumen.snapshot import Snapshot
+from cardumen.vision import VisionStage
 
 
 class PlaygroundScene:
 
     def __init__(self):
         self.layers = defaultdict(list)
+        self.time = 0.  # simulated time, in seconds
+        config = Handler().config
+        self.collision_world = CollisionWorld(config.WINDOW_SIZE, config.COLLISION_CELL_SIZE)
+        self.fish_pool = FishPool()
+        self.school = School(action_table=Swim.table())
+        # neighbours of each fish, indexed by school row
+        self.neighbours = NeighbourIndex(config.WINDOW_SIZE, config.NEIGHBOUR_CELL_SIZE, config.WRAP)
+        self.policy: Policy = MLPPolicy.load(config.POLICY_PATH) if config.POLICY_PATH else Agent(len(Swim))
+        self.vision = VisionStage(config.VISION_MODE, config.VISION_THREADS)
 
         water = WaterBg()
-        self.layers[0].append(water)
-        for i in range(0, Handler().config.n_fish):
-            w, h = Handler().config.WINDOW_SIZE
-            fish = Fish(PosRotScale(Vector2(w * random(), h * random())), cat=i % 7 + 1)
-            self.layers[-1].append(fish)
+        self.add_entity(water, 0)
+        for i in range(0, config.n_fish):
+            w, h = config.WINDOW_SIZE
+            self.spawn_fish(PosRotScale(Vector2(w * random(), h * random())), cat=i % 7 + 1)
 
-    def update(self, dt: float) -> None:
+    def add_entity(self, entity: Entity, layer: int) -> None:
+        """
+        Add entity to a layer of the scene and register its colliders.
+        :param entity: entity to add
+        :param layer: layer index, lower layers are updated later and rendered on top
+        :return:
+        """
+        self.layers[layer].append(entity)
+        for collider in entity.colliders:
+            self.collision_world.add(collider)
+        if isinstance(entity, Fish):
+            self.school.add(entity.prs)
+
+    def remove_entity(self, entity: Entity) -> None:
+        """
+        Remove entity from the scene and deregister its colliders.
+        :param entity: entity to remove
+        :return:
+        """
+        for entities in self.layers.values():
+            if entity in entities:
+                entities.remove(entity)
+        entity.remove()
+        if isinstance(entity, Fish):
+            self.school.remove(entity.prs)
+
+    def spawn_fish(self, prs: PosRotScale, cat: int = 1) -> Fish:
+        """
+        Add a fish to the scene, recycled from the pool if possible.
+        :param prs: position, rotation and scale of the fish
+        :param cat: category of the fish
+        :return: spawned fish
+        """
+        fish = self.fish_pool.acquire(prs, cat)
+        self.add_entity(fish, -1)
+        return fish
+
+    def despawn_fish(self, fish: Fish) -> None:
+        """
+        Remove a fish from the scene and return it to the pool.
+        :param fish: fish to remove
+        :return:
+        """
+        self.remove_entity(fish)
+        self.fish_pool.release(fish)
+
+    def update(self, dt: float, actions: np.ndarray = None) -> None:
         """
         Update scene.
         :param dt: time since last update
+        :param actions: action label of each fish, in the order of fishes, overriding the ones chosen by the policy
         :return:
         """
+        # choose the actions of all fish at once
+        fishes = self.fishes
+        if actions is None and fishes:
+            actions = self.policy.act(*self.observe(fishes))
+        if actions is not None:
+            self.school.action[[fish.prs.index for fish in fishes]] = actions
+
+        width, height = Handler().config.WINDOW_SIZE
         for layer in sorted(self.layers, reverse=True):
-            width, height = Handler().config.WINDOW_SIZE
-            for entity in self.layers[layer]:
+            # copy, entities may be removed during the update
+            for entity in list(self.layers[layer]):
                 entity.update(dt)
 
-                # wrap every entity position
-                if entity.prs.pos.x > width:
-                    entity.prs.pos.x -= width
-                elif entity.prs.pos.x < 0:
-                    entity.prs.pos.x += width
-                if entity.prs.pos.y > height:
-                    entity.prs.pos.y -= height
-                elif entity.prs.pos.y < 0:
-                    entity.prs.pos.y += height
+                # wrap every entity position, fish are wrapped by the school step
+                if isinstance(entity, Fish):
+                    continue
+                # assigned, so that the version of the PRS changes
+                x, y = entity.prs.pos
+                if x > width:
+                    x -= width
+                elif x < 0:
+                    x += width
+                if y > height:
+                    y -= height
+                elif y < 0:
+                    y += height
+                if (x, y) != entity.prs.pos:
+                    entity.prs.pos = Vector2(x, y)
+
+        # move all fish at once with their chosen actions
+        self.school.step(dt, (width, height))
+        self.neighbours.build(self.school.pos[:len(self.school)], self.school.rot[:len(self.school)])
+        self.time += dt
+
+        self.collision_world.step()
+        self.vision.update(self.fishes)
+
+        for layer in sorted(self.layers, reverse=True):
+            for entity in list(self.layers[layer]):
+                entity.late_update(dt)
+
+    def observe(self, fishes: list[Fish] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get the stacked observations of the fish, as computed in the last update.
+        :param fishes: fish to observe, all fish in the scene by default
+        :return: position and velocity of each fish, shape (n, 4), and view state of each fish,
+                 shape (n, height, width, 3)
+        """
+        if fishes is None:
+            fishes = self.fishes
+        rows = [fish.prs.index for fish in fishes]
+        states = np.concatenate([self.school.pos[rows], self.school.vel[rows]], axis=1)
+        if self.vision.observations is not None and self.vision.fishes == fishes:
+            views = self.vision.observations
+        else:
+            views = np.stack([fish.view_state for fish in fishes])
+        return states, views
+
+    @property
+    def fishes(self) -> list[Fish]:
+        """
+        Get all fish in the scene, in update order.
+        :return: list of fish
+        """
+        return [entity for layer in sorted(self.layers, reverse=True) for entity in self.layers[layer]
+                if isinstance(entity, Fish)]
+
+    def snapshot(self) -> Snapshot:
+        """
+        Take an immutable snapshot of the drawable state of the scene, for the render loop.
+        :return: snapshot
+        """
+        config = Handler().config
+        return Snapshot.capture(self, config.DEBUG, config.WINDOW_SIZE if config.WRAP else None)
 
     def render(self, display: Display) -> None:
         """
@@ -52,5 +174,6 @@ class PlaygroundScene:
         for layer in sorted(self.layers, reverse=True):
             for entity in self.layers[layer]:
                 entity.render(display)
+        display.draw_overlay()
         if Handler().config.DEBUG:
             display.draw_grid()
@@ -0,0 +1,202 @@
+"""
+Structure-of-arrays state of a group of fish, updated with vectorized operations.
+"""
+from __future__ import annotations
+
+import math
+
+import numpy as np
+from pygame import Vector2
+
+from cardumen.geometry import PosRotScale, rad2deg
+
+
+class School:
+    """
+    State of a group of fish held in contiguous NumPy arrays, one row per fish.
+    Fish keep a SchoolPosRotScale that points to their row, so that they can still be used as single objects.
+    Every call to step increments the version, which invalidates the caches that depend on the transformations.
+    """
+    # per-row fields and the shape of a single row
+    _FIELDS = {
+        'pos': (2,),
+        'vel': (2,),
+        'rot': (),
+        'scale': (),
+        'speed': (),
+        'min_speed': (),
+        'max_speed': (),
+        'tilt_speed': (),
+        'cat': (),
+        'action': (),
+    }
+
+    def __init__(self, capacity: int = 16, action_table: np.ndarray = None):
+        """
+        Create an empty school.
+
+        :param capacity: initial number of rows, grown as needed
+        :param action_table: for each action label, tilt sign and speed multiplier, shape (n_actions, 2)
+        """
+        self.size = 0
+        self.version = 0
+        self.action_table = None if action_table is None else np.asarray(action_table, dtype=float)
+        self._members = []  # SchoolPosRotScale of each row
+        for name, shape in self._FIELDS.items():
+            dtype = int if name in ('cat', 'action') else float
+            setattr(self, name, np.zeros((capacity, *shape), dtype=dtype))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, prs: SchoolPosRotScale) -> None:
+        """
+        Move a row from the school of the PRS into this school. The PRS is updated to point to the new row.
+
+        :param prs: PRS of the fish
+        :return:
+        """
+        if prs.school is self:
+            return
+        if self.size == len(self.pos):
+            self._grow(max(1, 2 * self.size))
+        old_school, old_index, old_version = prs.school, prs.index, prs.version
+        for name in self._FIELDS:
+            getattr(self, name)[self.size] = getattr(old_school, name)[old_index]
+        old_school._delete(old_index)
+        self._members.append(prs)
+        prs.school, prs.index = self, self.size
+        prs.version = old_version + 1
+        self.size += 1
+
+    def remove(self, prs: SchoolPosRotScale) -> None:
+        """
+        Move a row out of this school into a private school of its own.
+
+        :param prs: PRS of the fish
+        :return:
+        """
+        if prs.school is not self:
+            return
+        School(capacity=1).add(prs)
+
+    def step(self, dt: float, world_size: tuple[float, float]) -> None:
+        """
+        Apply the actions, clamp the speeds, integrate the positions and wrap them around the world,
+        each as a single operation over all fish.
+
+        :param dt: time since last update
+        :param world_size: width and height of the world
+        :return:
+        """
+        n = self.size
+        if n == 0:
+            return
+        tilt_sign, vel_multiplier = self.action_table[self.action[:n]].T
+        self.rot[:n] += tilt_sign * dt * self.tilt_speed[:n]
+        self.speed[:n] = np.clip(self.speed[:n] * vel_multiplier, self.min_speed[:n], self.max_speed[:n])
+        self.update_vel()
+        self.pos[:n] += self.vel[:n] * dt
+        self.pos[:n] %= np.asarray(world_size, dtype=float)
+        self.version += 1
+
+    def update_vel(self) -> None:
+        """
+        Recompute velocities from speeds and rotations, same as Vector2.from_polar((speed, -rot_deg)).
+
+        :return:
+        """
+        n = self.size
+        self.vel[:n, 0] = self.speed[:n] * np.cos(self.rot[:n])
+        self.vel[:n, 1] = -self.speed[:n] * np.sin(self.rot[:n])
+
+    def _delete(self, index: int) -> None:
+        # move the last row into the freed one
+        last = self.size - 1
+        if index != last:
+            for name in self._FIELDS:
+                getattr(self, name)[index] = getattr(self, name)[last]
+            moved = self._members[last]
+            self._members[index] = moved
+            moved.index = index
+        self._members.pop()
+        self.size -= 1
+
+    def _grow(self, capacity: int) -> None:
+        for name in self._FIELDS:
+            old = getattr(self, name)
+            new = np.zeros((capacity, *old.shape[1:]), dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+
+class SchoolPosRotScale(PosRotScale):
+    """
+    PosRotScale stored in a row of a School.
+    The position is a new Vector2 holding the values of the row, changing it in place does not move the object:
+    assign it back, e.g. prs.pos += d, so that the row is written and the version incremented.
+    """
+
+    def __init__(self, pos: Vector2 = Vector2(0, 0), rot: float = 0, scale: float = 1):
+        """
+        Create a PRS in a private school of its own. Add it to another school with School.add.
+
+        :param pos: position of the object
+        :param rot: rotation of the object, in radians, positive counterclockwise
+        :param scale: scale of the object
+        """
+        self.school = School(capacity=1)
+        self.school._members.append(self)
+        self.school.size = 1
+        self.index = 0
+        self._own_version = 0
+        self._trig_version = None
+        super().__init__(pos, rot, scale)
+
+    @classmethod
+    def from_prs(cls, prs: PosRotScale) -> SchoolPosRotScale:
+        return cls(prs.pos.copy(), prs.rot, prs.scale)
+
+    @property
+    def version(self) -> int:
+        # the own counter is adjusted when moving between schools, so that the version never decreases
+        return self.school.version + self._own_version
+
+    @version.setter
+    def version(self, version: int) -> None:
+        self._own_version = version - self.school.version
+
+    @property
+    def pos(self) -> Vector2:
+        return Vector2(self.school.pos[self.index].tolist())
+
+    @pos.setter
+    def pos(self, pos: Vector2) -> None:
+        self.school.pos[self.index] = pos
+        self._own_version += 1
+
+    @property
+    def rot(self) -> float:
+        return float(self.school.rot[self.index])
+
+    @rot.setter
+    def rot(self, rot: float) -> None:
+        self.school.rot[self.index] = rot
+        self._own_version += 1
+
+    @property
+    def scale(self) -> float:
+        return float(self.school.scale[self.index])
+
+    @scale.setter
+    def scale(self, scale: float) -> None:
+        self.school.scale[self.index] = scale
+        self._own_version += 1
+
+    def _get_trig(self) -> tuple[float, float, float]:
+        version = self.version
+        if self._trig_version != version:
+            rot = self.rot
+            self._trig = (math.cos(rot), math.sin(rot), rad2deg(rot))
+            self._trig_version = version
+        return self._trig
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import numpy as np
 import pygame
 from pygame import Vector2
 
@@ -25,6 +26,14 @@ class Polygon:
         """
         self.prs = prs
         self._local_points = local_points  # local coordinates
+        self._local_array = np.array(local_points, dtype=float).reshape(-1, 2)
+        self._local_radius = max(p.length() for p in local_points)
+        # global coordinates, cached until the transformation changes
+        self._cache_prs = None
+        self._cache_version = None
+        self._vertices = None
+        self._points = None
+        self._aabb = None
         self.fill_color = fill_color
         self.line_color = line_color
         self._initial_fill_color = fill_color
@@ -67,13 +76,26 @@ class Polygon:
         :return: True if polygons intersect, False otherwise
         """
         if check_wrap:
-            for wrap in utils.get_wraps():
-                if Intersection.intersect(self.clone_at(self.prs.pos + wrap), other):
+            # only the images within reach of the other polygon are tested, usually the minimum image alone
+            reach = self.bounding_radius + other.bounding_radius
+            for wrap in utils.get_near_wraps(other.prs.pos - self.prs.pos, reach):
+                if Intersection.intersect(self, other, offset=wrap):
                     return True
             return False
         else:
             return Intersection.intersect(self, other)
 
+    def intersects_many(self, others: list[Polygon], check_wrap: bool = True) -> np.ndarray:
+        """
+        Check intersection with several polygons at once.
+        Polygons are assumed convex and tested in a single vectorized pass.
+
+        :param others: other polygons
+        :param check_wrap: check if also copies of the polygons wrapped around the screen
+        :return: boolean array, True where polygons intersect
+        """
+        return Intersection.intersect_pairs([self] * len(others), others, check_wrap)
+
     def get_surface(self, return_rect=False, local=False) -> pygame.Surface | tuple[pygame.Surface, pygame.Rect]:
         """
         Get pygame surface of the polygon, in global (or local) coordinates.
@@ -110,6 +132,15 @@ class Polygon:
         """
         return [p for p in self._local_points]
 
+    @property
+    def bounding_radius(self) -> float:
+        """
+        Get radius of the smallest circle centered at the PRS position that contains the polygon.
+
+        :return: radius in global coordinates
+        """
+        return self.prs.scale * self._local_radius
+
     @property
     def points(self) -> list[Vector2]:
         """
@@ -117,7 +148,54 @@ class Polygon:
 
         :return: list of points
         """
-        return [(self.prs.scale * p.rotate(-self.prs.rot_deg) + self.prs.pos) for p in self._local_points]
+        self._update_cache()
+        return list(self._points)
+
+    @property
+    def vertices(self) -> np.ndarray:
+        """
+        Get points in global coordinates as an array.
+        The array is cached and must not be modified.
+
+        :return: array of shape (n, 2)
+        """
+        self._update_cache()
+        return self._vertices
+
+    @property
+    def aabb(self) -> tuple[float, float, float, float]:
+        """
+        Get axis-aligned bounding box in global coordinates.
+
+        :return: bounding box as (xmin, ymin, xmax, ymax)
+        """
+        self._update_cache()
+        return self._aabb
+
+    def _update_cache(self) -> None:
+        """
+        Recompute global points if the PRS was replaced or its version changed.
+
+        :return:
+        """
+        prs = self.prs
+        if prs is self._cache_prs and prs.version == self._cache_version:
+            return
+        # same as rotating each point by -rot_deg, positive angles are counterclockwise on screen
+        c, s = prs.cos, prs.sin
+        x, y = self._local_array[:, 0], self._local_array[:, 1]
+        vertices = np.empty_like(self._local_array)
+        pos = prs.pos
+        vertices[:, 0] = prs.scale * (x * c + y * s) + pos.x
+        vertices[:, 1] = prs.scale * (y * c - x * s) + pos.y
+        vertices.flags.writeable = False
+        self._vertices = vertices
+        self._points = [Vector2(p) for p in vertices.tolist()]
+        xmin, ymin = vertices.min(axis=0).tolist()
+        xmax, ymax = vertices.max(axis=0).tolist()
+        self._aabb = (xmin, ymin, xmax, ymax)
+        self._cache_prs = prs
+        self._cache_version = prs.version
 
 
 class ConvexQuad(Polygon):
@@ -133,15 +211,16 @@ class ConvexQuad(Polygon):
 class Intersection:
 
     @staticmethod
-    def intersect(poly1: Polygon, poly2: Polygon) -> bool:
+    def intersect(poly1: Polygon, poly2: Polygon, offset: Vector2 = None) -> bool:
         """
         Check if two polygons intersect.
 
         :param poly1: polygon 1
         :param poly2: polygon 2
+        :param offset: translation applied to polygon 1, optional
         :return: True if polygons intersect, False otherwise
         """
-        tris1 = Intersection._get_tris(poly1)
+        tris1 = Intersection._get_tris(poly1, offset)
         tris2 = Intersection._get_tris(poly2)
         for tri1 in tris1:
             for tri2 in tris2:
@@ -149,6 +228,57 @@ class Intersection:
                     return True
         return False
 
+    @staticmethod
+    def intersect_pairs(polys1: list[Polygon], polys2: list[Polygon], check_wrap: bool = True) -> np.ndarray:
+        """
+        Check if pairs of convex polygons intersect, all pairs in a few vectorized passes.
+        Wrapped copies are only tested if their bounding circles are within reach.
+
+        :param polys1: first polygon of each pair
+        :param polys2: second polygon of each pair
+        :param check_wrap: check if also copies of the polygons wrapped around the screen
+        :return: boolean array, True where the pair intersects
+        """
+        result = np.zeros(len(polys1), dtype=bool)
+        if not polys1:
+            return result
+        # keep only the wrapped copies of polygon 1 whose bounding circle reaches polygon 2
+        centers1 = np.array([poly.prs.pos for poly in polys1], dtype=float)
+        centers2 = np.array([poly.prs.pos for poly in polys2], dtype=float)
+        reach = np.array([p1.bounding_radius + p2.bounding_radius for p1, p2 in zip(polys1, polys2)])
+        pair, offsets = utils.get_near_wraps_batch(centers2 - centers1, reach, check_wrap)
+        if len(pair) == 0:
+            return result
+        # batch pairs with the same number of vertices together
+        sizes = np.array([(len(polys1[i].vertices), len(polys2[i].vertices)) for i in pair]).reshape(-1, 2)
+        for size in np.unique(sizes, axis=0):
+            mask = (sizes == size).all(axis=1)
+            idx = pair[mask]
+            batch1 = np.stack([polys1[i].vertices for i in idx]) + offsets[mask][:, None]
+            batch2 = np.stack([polys2[i].vertices for i in idx])
+            result[idx[Intersection.intersect_batch(batch1, batch2)]] = True
+        return result
+
+    @staticmethod
+    def intersect_batch(polys1: np.ndarray, polys2: np.ndarray) -> np.ndarray:
+        """
+        Check if K pairs of convex polygons intersect, using the separating axis theorem.
+        Two convex polygons are disjoint iff their projections are disjoint on some edge normal.
+        Unlike the triangle test, this also detects a polygon fully contained in the other.
+
+        :param polys1: points of the first polygon of each pair in global coordinates, shape (K, N, 2)
+        :param polys2: points of the second polygon of each pair in global coordinates, shape (K, M, 2)
+        :return: boolean array of shape (K,), True where the pair intersects
+        """
+        polys1 = np.asarray(polys1, dtype=float)
+        polys2 = np.asarray(polys2, dtype=float)
+        edges = np.concatenate([np.roll(polys1, -1, axis=1) - polys1, np.roll(polys2, -1, axis=1) - polys2], axis=1)
+        axes = np.stack([-edges[..., 1], edges[..., 0]], axis=-1)  # (K, N+M, 2), not normalized
+        proj1 = np.einsum('kad,kpd->kap', axes, polys1)
+        proj2 = np.einsum('kad,kpd->kap', axes, polys2)
+        overlap = (proj1.max(axis=2) >= proj2.min(axis=2)) & (proj2.max(axis=2) >= proj1.min(axis=2))
+        return overlap.all(axis=1)
+
     @staticmethod
     def intersect_point(poly: Polygon, point: Vector2) -> bool:
         """
@@ -165,16 +295,19 @@ class Intersection:
         return False
 
     @staticmethod
-    def _get_tris(poly: Polygon) -> list[tuple[Vector2, Vector2, Vector2]]:
+    def _get_tris(poly: Polygon, offset: Vector2 = None) -> list[tuple[Vector2, Vector2, Vector2]]:
         """
         Get triangles of the polygon.
         Only works for convex polygons.
         Points are given in global coordinates.
 
         :param poly: polygon
+        :param offset: translation applied to the points, optional
         :return: list of triangles (3-tuples of points)
         """
         points = poly.points
+        if offset is not None:
+            points = [p + offset for p in points]
         tris = []
         for i in range(len(points) - 2):
             tris.append((points[0], points[i + 1], points[i + 2]))
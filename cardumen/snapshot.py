@@ -0,0 +1,216 @@
+"""
+Immutable snapshots of the drawable state of a scene, passed from the update loop to the render loop.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pygame
+from pygame import Vector2
+
+from cardumen.display import Display
+from cardumen.geometry import PosRotScale
+from cardumen.sprite import Sprite
+
+
+def _frozen(arr: np.ndarray) -> np.ndarray:
+    arr = np.array(arr)
+    arr.flags.writeable = False
+    return arr
+
+
+class Snapshot:
+    """
+    Compact copy of everything needed to draw a scene at one tick: one row per entity with a sprite,
+    in render order, plus the debug polygons of their colliders with their current colors.
+    Arrays are read-only and sprites are shared, never modified after loading,
+    so a snapshot can be read by the render thread while the scene keeps updating.
+    """
+
+    def __init__(self, time_: float, ids: np.ndarray, pos: np.ndarray, rot: np.ndarray, scale: np.ndarray,
+                 cat: np.ndarray, sprites: tuple[Sprite, ...], wrap: np.ndarray,
+                 polygons: tuple[tuple[int, np.ndarray, tuple, tuple], ...] = (), debug: bool = False,
+                 world_size: tuple[float, float] = None, static: np.ndarray = None):
+        """
+        Create a snapshot. Prefer Snapshot.capture.
+
+        :param time_: simulated time of the scene
+        :param ids: identifier of each entity, shape (n,)
+        :param pos: position of each entity, shape (n, 2)
+        :param rot: rotation of each entity, in radians, shape (n,)
+        :param scale: scale of each entity, shape (n,)
+        :param cat: category of each fish, 0 for other entities, shape (n,)
+        :param sprites: sprite of each entity
+        :param wrap: whether each sprite is drawn wrapped around the world, shape (n,)
+        :param polygons: debug polygons as (entity row, vertices in global coordinates, fill color, line color)
+        :param debug: whether polygons and grid are drawn
+        :param world_size: width and height of the world, if it wraps around
+        :param static: whether each entity never moves, shape (n,), none by default
+        """
+        self.time = time_
+        self.stamp = time.perf_counter()  # wall-clock time of the capture, for interpolation
+        self.ids = _frozen(ids)
+        self.pos = _frozen(pos)
+        self.rot = _frozen(rot)
+        self.scale = _frozen(scale)
+        self.cat = _frozen(cat)
+        self.sprites = tuple(sprites)
+        self.wrap = _frozen(wrap)
+        self.polygons = tuple(polygons)
+        self.debug = debug
+        self.world_size = world_size
+        self.static = _frozen(np.zeros(len(self.ids), dtype=bool) if static is None else static)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def capture(cls, scene, debug: bool = False, world_size: tuple[float, float] = None) -> Snapshot:
+        """
+        Take a snapshot of a scene.
+
+        :param scene: scene, not type hinted to avoid circular import
+        :param debug: whether to include the collider polygons
+        :param world_size: width and height of the world, if it wraps around
+        :return: snapshot
+        """
+        ids, pos, rot, scale, cat, sprites, wrap, static, polygons = [], [], [], [], [], [], [], [], []
+        for layer in sorted(scene.layers, reverse=True):
+            for entity in scene.layers[layer]:
+                if entity.sprite is None:
+                    continue
+                row = len(ids)
+                prs = entity.prs
+                ids.append(entity.id)
+                pos.append(tuple(prs.pos))
+                rot.append(prs.rot)
+                scale.append(prs.scale)
+                cat.append(getattr(entity, 'cat', 0))
+                sprites.append(entity.sprite)
+                wrap.append(entity.wrap)
+                static.append(entity.static)
+                if debug:
+                    for collider in entity.colliders:
+                        poly = collider.poly
+                        polygons.append((row, _frozen(poly.vertices), poly.fill_color, poly.line_color))
+        return cls(scene.time, np.array(ids, dtype=np.int64), np.array(pos, dtype=float).reshape(-1, 2),
+                   np.array(rot, dtype=float), np.array(scale, dtype=float), np.array(cat, dtype=int),
+                   tuple(sprites), np.array(wrap, dtype=bool), polygons, debug, world_size,
+                   np.array(static, dtype=bool))
+
+    def interpolate(self, other: Snapshot, alpha: float) -> Snapshot:
+        """
+        Blend this snapshot towards a later one.
+        Entities are matched by id, those missing from this snapshot are taken from the later one.
+        Positions are blended along the shortest path around the world, rotations along the shortest arc.
+
+        :param other: later snapshot
+        :param alpha: blending factor, 0 gives this snapshot and 1 the later one
+        :return: blended snapshot, with the entities and colors of the later one
+        """
+        if alpha >= 1 or len(self) == 0:
+            return other
+        if np.array_equal(self.ids, other.ids):
+            rows = np.arange(len(other))
+            found = np.ones(len(other), dtype=bool)
+        else:
+            index = {entity_id: row for row, entity_id in enumerate(self.ids.tolist())}
+            rows = np.array([index.get(entity_id, -1) for entity_id in other.ids.tolist()], dtype=int)
+            found = rows >= 0
+            rows = np.where(found, rows, 0)
+
+        d = other.pos - self.pos[rows]
+        if other.world_size is not None:
+            size = np.asarray(other.world_size, dtype=float)
+            d -= size * np.round(d / size)
+        pos = other.pos - (1 - alpha) * d
+        if other.world_size is not None:
+            pos %= size
+        d_rot = (other.rot - self.rot[rows] + np.pi) % (2 * np.pi) - np.pi
+        rot = other.rot - (1 - alpha) * d_rot
+        scale = other.scale + (1 - alpha) * (self.scale[rows] - other.scale)
+        pos = np.where(found[:, None], pos, other.pos)
+        rot = np.where(found, rot, other.rot)
+        scale = np.where(found, scale, other.scale)
+
+        # polygons follow the displacement of their entity
+        shift = pos - other.pos
+        polygons = tuple((row, vertices + shift[row], fill, line) for row, vertices, fill, line in other.polygons)
+        blended = Snapshot(other.time - (1 - alpha) * (other.time - self.time), other.ids, pos, rot, scale,
+                           other.cat, other.sprites, other.wrap, polygons, other.debug, other.world_size,
+                           other.static)
+        blended.stamp = other.stamp - (1 - alpha) * (other.stamp - self.stamp)
+        return blended
+
+    def render(self, display: Display, rows: list[int] = None, grid: bool = True) -> list[pygame.Rect]:
+        """
+        Render snapshot.
+
+        :param display: display to render to
+        :param rows: entities to render, in render order, all by default
+        :param grid: whether to draw the debug grid, if debug
+        :return: screen regions drawn
+        """
+        rows = range(len(self)) if rows is None else rows
+        polygons = {}
+        for polygon in self.polygons:
+            polygons.setdefault(polygon[0], []).append(polygon)
+        rects = []
+        # same order as Entity.render, the polygons of the colliders are composited after all sprites
+        for row in rows:
+            x, y = self.pos[row].tolist()
+            prs = PosRotScale(Vector2(x, y), float(self.rot[row]), float(self.scale[row]))
+            rects += display.draw_sprite(self.sprites[row], prs, wrap=bool(self.wrap[row]))
+            for _, vertices, fill_color, line_color in polygons.get(row, ()):
+                display.draw_polygon([Vector2(p) for p in vertices.tolist()], fill_color, line_color)
+        rects += display.draw_overlay()
+        if self.debug and grid:
+            display.draw_grid()
+        return rects
+
+
+class SnapshotBuffer:
+    """
+    The last few snapshots published by the update loop, read by the render loop.
+    Snapshots are immutable, so publishing and reading only swap references under a short lock,
+    and the render loop never sees a scene in the middle of an update.
+    """
+
+    def __init__(self, size: int = 3):
+        """
+        Create an empty buffer.
+
+        :param size: number of snapshots kept, at least 2 for interpolation
+        """
+        self._snapshots = deque(maxlen=max(2, size))
+        self._lock = threading.Lock()
+
+    def publish(self, snapshot: Snapshot) -> None:
+        with self._lock:
+            self._snapshots.append(snapshot)
+
+    def latest(self) -> Snapshot | None:
+        with self._lock:
+            return self._snapshots[-1] if self._snapshots else None
+
+    def at(self, stamp: float) -> Snapshot | None:
+        """
+        Get the state at a wall-clock time, interpolated between the two snapshots around it.
+        Times before the oldest or after the newest snapshot are clamped.
+
+        :param stamp: time, as given by time.perf_counter
+        :return: snapshot, or None if nothing has been published
+        """
+        with self._lock:
+            snapshots = list(self._snapshots)
+        if not snapshots:
+            return None
+        for before, after in zip(snapshots[-2::-1], snapshots[:0:-1]):
+            if before.stamp <= stamp:
+                if after.stamp <= before.stamp:
+                    return after
+                return before.interpolate(after, min(1., (stamp - before.stamp) / (after.stamp - before.stamp)))
+        return snapshots[0]
@@ -1,6 +1,9 @@
+import threading
+from collections import OrderedDict
+
 import pygame
 
-from cardumen.geometry import rad2deg
+from cardumen.geometry import deg2rad, rad2deg
 
 
 def rotate_surface(surface: pygame.Surface, angle: float) -> pygame.Surface:
@@ -45,6 +48,21 @@ def rotate_scale_surface(surface: pygame.Surface, angle: float, scale: float) ->
 
 
 class Sprite:
+    """
+    Image drawn at the position, rotation and scale of an entity.
+    Transformed surfaces are kept in an atlas shared by all sprites, with rotations quantized to ANGLE_STEP degrees,
+    so that drawing a sprite is usually a lookup and a blit.
+    The atlas is bounded to ATLAS_BYTES, least recently used surfaces are evicted first.
+    Loaded images are shared by all sprites of the same file and alpha, and must not be modified.
+    """
+    ANGLE_STEP = 1  # degrees
+    ATLAS_BYTES = 64 * 2 ** 20
+    _IMAGES = {}  # (path, alpha) -> loaded surface
+    _SIZES = {}  # (path, alpha, rot, scale) -> exact size of the transformed image
+    _ATLAS = OrderedDict()  # (path, alpha, angle index, scale) -> surface
+    _ATLAS_SIZE = 0  # bytes
+    _ATLAS_LOCK = threading.Lock()  # sprites are drawn from the render thread and measured from the update thread
+
     def __init__(self, path: str, rot: float = 0, scale: float = 1, alpha: int = 255):
         """
         Create a rectangular sprite from an image.
@@ -54,13 +72,34 @@ class Sprite:
         :param scale: scaling to be applied to the image when imported, optional
         :param alpha: alpha channel of the sprite, int ranging from 0(transparent) to 255(solid), 255 by default
         """
-        loaded_img_surf = pygame.image.load(path)
-        loaded_img_surf.set_alpha(alpha)
-        self._image = loaded_img_surf
+        self._image = self.load_image(path, alpha)
+        self.path = path
+        self.alpha = alpha
 
         self._rot = rot
         self._scale = scale
 
+    @classmethod
+    def load_image(cls, path: str, alpha: int = 255) -> pygame.Surface:
+        """
+        Load an image once, later calls return the same surface.
+
+        :param path: path to image
+        :param alpha: alpha channel of the image
+        :return: shared surface, must not be modified
+        """
+        key = (path, alpha)
+        with cls._ATLAS_LOCK:
+            image = cls._IMAGES.get(key)
+        if image is None:
+            image = pygame.image.load(path)
+            if pygame.display.get_surface() is not None:
+                image = image.convert_alpha()
+            image.set_alpha(alpha)
+            with cls._ATLAS_LOCK:
+                image = cls._IMAGES.setdefault(key, image)
+        return image
+
     def apply_transform(self, rot: float = 0, scale: float = 1) -> None:
         """
         Apply rotation and scaling to the sprite.
@@ -75,17 +114,59 @@ class Sprite:
     def get_transformed(self, rot: float = 0, scale: float = 1) -> pygame.Surface:
         """
         Apply rotation and scaling to the sprite.
+        The rotation is rounded to ANGLE_STEP degrees and the surface is taken from the atlas if possible.
+        The returned surface is shared and must not be modified.
 
         :param rot: angle of the rotation, in radians
         :param scale: magnitude of the scale
         :return:
         """
-        return rotate_scale_surface(self._image, self._rot + rot, self._scale * scale)
+        steps = round(360 / self.ANGLE_STEP)
+        angle_index = round(rad2deg(self._rot + rot) / self.ANGLE_STEP) % steps
+        key = (self.path, self.alpha, angle_index, round(self._scale * scale, 6))
+        cls = Sprite
+        with cls._ATLAS_LOCK:
+            surface = cls._ATLAS.get(key)
+            if surface is not None:
+                cls._ATLAS.move_to_end(key)
+                return surface
+
+        surface = rotate_scale_surface(self._image, deg2rad(angle_index * self.ANGLE_STEP), self._scale * scale)
+        if pygame.display.get_surface() is not None:
+            # same pixel format as the screen, faster to blit
+            surface = surface.convert_alpha()
+            surface.set_alpha(self.alpha)
+        size = surface.get_bytesize() * surface.get_width() * surface.get_height()
+        with cls._ATLAS_LOCK:
+            if key not in cls._ATLAS:
+                cls._ATLAS[key] = surface
+                cls._ATLAS_SIZE += size
+            while cls._ATLAS_SIZE > cls.ATLAS_BYTES and len(cls._ATLAS) > 1:
+                _, evicted = cls._ATLAS.popitem(last=False)
+                cls._ATLAS_SIZE -= evicted.get_bytesize() * evicted.get_width() * evicted.get_height()
+        return surface
+
+    @property
+    def key(self) -> tuple[str, float, float, int]:
+        """
+        Arguments that recreate this sprite, e.g. in another process.
+
+        :return: path, rotation, scale and alpha
+        """
+        return self.path, self._rot, self._scale, self.alpha
 
     @property
     def width(self) -> int:
-        return self.get_transformed().get_width()
+        return self._get_size()[0]
 
     @property
     def height(self) -> int:
-        return self.get_transformed().get_height()
+        return self._get_size()[1]
+
+    def _get_size(self) -> tuple[int, int]:
+        # exact size, without rounding the rotation, shared by sprites with the same transform
+        key = self.key
+        size = self._SIZES.get(key)
+        if size is None:
+            size = self._SIZES[key] = rotate_scale_surface(self._image, self._rot, self._scale).get_size()
+        return size
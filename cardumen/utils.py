@@ -53,6 +53,48 @@ def get_wraps(rect: pygame.Rect = None) -> list[Vector2]:
     return repeats
 
 
+def get_min_image(displacement: Vector2) -> Vector2:
+    """
+    Get the shortest displacement between two points in the wrapped world.
+
+    :param displacement: displacement between the points, without wrapping
+    :return: displacement to the nearest image of the second point
+    """
+    width, height = Handler().config.WINDOW_SIZE
+    return Vector2(displacement.x - width * round(displacement.x / width),
+                   displacement.y - height * round(displacement.y / height))
+
+
+def get_near_wraps(displacement: Vector2, reach: float) -> list[Vector2]:
+    """
+    Get the wrap offsets that bring an object within reach of another one.
+    Usually only the minimum image is returned, two or more only for objects larger than half the world.
+
+    :param displacement: displacement from the object to the other one, without wrapping
+    :param reach: maximum distance between the objects, e.g. the sum of their bounding radii
+    :return: list of offsets to be added to the position of the object, subset of get_wraps()
+    """
+    if get_min_image(displacement).length() > reach:
+        return []
+    return [wrap for wrap in get_wraps() if displacement.distance_to(wrap) <= reach]
+
+
+def get_near_wraps_batch(displacements: np.ndarray, reach: np.ndarray,
+                         check_wrap: bool = True) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized get_near_wraps for many pairs of objects.
+
+    :param displacements: displacements from each object to the other one, without wrapping, shape (n, 2)
+    :param reach: maximum distance between each pair of objects, shape (n,)
+    :param check_wrap: if False, only the unwrapped position is considered
+    :return: (index, offset) where index (k,) refers to the pair and offset (k, 2) is to be added to its object
+    """
+    offsets = np.array(get_wraps() if check_wrap else [(0, 0)], dtype=float)
+    dist = np.linalg.norm(displacements[:, None] - offsets[None], axis=2)
+    index, wrap = np.nonzero(dist <= np.asarray(reach)[:, None])
+    return index, offsets[wrap]
+
+
 def check_convex_polygon(points: list[Vector2]) -> bool:
     # cv2.isContourConvex, scipy.spatial.ConvexHull, etc. are too slow/heavy
     if len(points) < 3:
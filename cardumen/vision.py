@@ -0,0 +1,138 @@
+"""
+Scene-level vision: computes the view state of every fish in one batch per tick.
+"""
+from __future__ import annotations
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from cardumen import raster, utils
+
+
+class VisionStage:
+    """
+    Computes the view state of all fish at once, after collisions are detected.
+    The visible bodies are taken from the contacts of the view colliders and transformed to all view frames
+    in a few array operations. Drawing and projecting each view is then spread over a thread pool,
+    since the cv2 calls release the GIL.
+    View states are stored in a single stacked buffer, one slot per fish.
+    """
+
+    def __init__(self, mode: str = 'warp', workers: int = None):
+        """
+        Create a vision stage.
+
+        :param mode: 'warp' draws the view canvas and warps it, 'analytic' projects the polygons straight
+                     into the view state
+        :param workers: number of threads, defaults to the number of CPUs
+        """
+        if mode not in ('warp', 'analytic'):
+            raise ValueError(f"Unknown vision mode {mode}")
+        self.mode = mode
+        self._workers = workers or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=self._workers) if self._workers > 1 else None
+        self._buffer = None
+        self.observations = None
+        self.fishes = []  # fish of the last update, in the order of the observations
+
+    def update(self, fishes: list) -> np.ndarray:
+        """
+        Compute the view state of all fish. Each fish view_state is set to its slot of the stacked buffer.
+
+        :param fishes: list of fish
+        :return: stacked view states, shape (n, height, width, 3)
+        """
+        observations = self._get_buffer(fishes)
+        polygons = self._collect_polygons(fishes)
+        jobs = [(fish, polys, out) for fish, polys, out in zip(fishes, polygons, observations)]
+        if self._executor is None or len(jobs) < 2:
+            self._render(jobs)
+        else:
+            chunks = [jobs[i::self._workers] for i in range(self._workers)]
+            list(self._executor.map(self._render, chunks))
+        for fish, out in zip(fishes, observations):
+            fish.view_state = out
+        self.observations = observations
+        self.fishes = list(fishes)
+        return observations
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    def _get_buffer(self, fishes: list) -> np.ndarray:
+        """
+        Get the stacked buffer for the given fish, grown geometrically as the population grows.
+
+        :param fishes: list of fish
+        :return: view of the buffer with one slot per fish
+        """
+        sizes = {fish.view_projection.output_size for fish in fishes}
+        if len(sizes) > 1:
+            raise ValueError(f"All fish must have the same view output size, got {sizes}")
+        width, height = sizes.pop() if sizes else (0, 0)
+        n = len(fishes)
+        if self._buffer is None or self._buffer.shape[1:3] != (height, width) or len(self._buffer) < n:
+            capacity = max(n, 2 * len(self._buffer) if self._buffer is not None else 0)
+            self._buffer = np.zeros((capacity, height, width, 3), dtype=np.uint8)
+        return self._buffer[:n]
+
+    @staticmethod
+    def _collect_polygons(fishes: list) -> list[list[tuple[np.ndarray, tuple]]]:
+        """
+        Get the visible body polygons of each fish, in view canvas coordinates.
+        All (view, body) contacts and their wrapped copies are transformed together.
+
+        :param fishes: list of fish
+        :return: for each fish, list of (points, color)
+        """
+        polygons = [[] for _ in fishes]
+        owners, bodies = [], []
+        for i, fish in enumerate(fishes):
+            for body in fish.view._colliding:
+                owners.append(i)
+                bodies.append(body)
+        if not bodies:
+            return polygons
+
+        views = [fish.view.poly for fish in fishes]
+        view_pos = np.array([view.prs.pos for view in views], dtype=float)
+        view_trig = np.array([(view.prs.cos, view.prs.sin, view.prs.scale) for view in views])
+        view_radius = np.array([view.bounding_radius for view in views])
+        view_origin = np.array([fish.view_origin for fish in fishes])
+
+        owners = np.array(owners)
+        body_pos = np.array([body.poly.prs.pos for body in bodies], dtype=float)
+        reach = view_radius[owners] + np.array([body.poly.bounding_radius for body in bodies])
+        pair, offsets = utils.get_near_wraps_batch(view_pos[owners] - body_pos, reach)
+        if len(pair) == 0:
+            return polygons
+
+        # batch bodies with the same number of vertices together, same transformation as PosRotScale.to_local
+        sizes = np.array([len(bodies[p].poly.vertices) for p in pair])
+        for size in np.unique(sizes):
+            mask = sizes == size
+            idx, own = pair[mask], owners[pair[mask]]
+            d = np.stack([bodies[p].poly.vertices for p in idx]) + (offsets[mask] - view_pos[own])[:, None]
+            dx, dy = d[..., 0], d[..., 1]
+            c, s, scale = (view_trig[own, k][:, None] for k in range(3))
+            local = np.stack([dx * c - dy * s, dx * s + dy * c], axis=-1) / scale[..., None]
+            local -= view_origin[own][:, None]
+            for points, p, o in zip(local, idx, own):
+                polygons[o].append((points, bodies[p].poly.fill_color[:3]))
+        return polygons
+
+    def _render(self, jobs: list[tuple]) -> None:
+        for fish, polygons, out in jobs:
+            if not polygons:
+                out.fill(0)
+            elif self.mode == 'analytic':
+                fish.view_projection.project_polygons(*zip(*polygons), out=out)
+            else:
+                canvas = fish.view_detect
+                canvas.fill(0)
+                for points, color in polygons:
+                    raster.fill_convex_polygon(canvas, points, color)
+                fish.view_projection(canvas, out=out)
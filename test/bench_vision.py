@@ -0,0 +1,73 @@
+"""
+Benchmark of the vision modes of the fish view: 'warp' (rasterize the view canvas, then warp it)
+against 'analytic' (project the polygons straight into the output).
+Run from the test directory: python bench_vision.py
+"""
+import time
+
+import numpy as np
+from pygame import Vector2
+
+from cardumen import raster, utils
+from cardumen.geometry import PosRotScale, deg2rad, move_points, rotate_points, scale_points
+from cardumen.projection import Projection
+from cardumen.shapes import ConvexQuad
+
+
+def make_view() -> tuple[Projection, tuple[int, int]]:
+    # same trapezoid as Fish, for a 77x23 sprite
+    w, h = 77, 23
+    points = [Vector2(2, 0), Vector2(6, 12), Vector2(-6, 12), Vector2(-2, 0)]
+    points = move_points(rotate_points(scale_points(points, h / 2), deg2rad(90)), Vector2(0.75 * w / 2, 0))
+    view = ConvexQuad(PosRotScale(), points)
+    rect = utils.get_rect(view.local_points)
+    return Projection.from_convex_quad(view), (rect.height, rect.width)
+
+
+def make_bodies(rng: np.random.Generator, n: int, canvas_shape: tuple[int, int]) -> list[np.ndarray]:
+    half = np.array([[-38, -11], [38, -11], [38, 11], [-38, 11]])
+    bodies = []
+    for _ in range(n):
+        angle = rng.uniform(0, 2 * np.pi)
+        rot = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+        bodies.append(half @ rot.T + rng.uniform(0, canvas_shape[::-1], 2))
+    return bodies
+
+
+def warp(projection, canvas, bodies, colors):
+    canvas.fill(0)
+    for points, color in zip(bodies, colors):
+        raster.fill_convex_polygon(canvas, points, color)
+    return projection(canvas)
+
+
+def analytic(projection, canvas, bodies, colors):
+    return projection.project_polygons(bodies, colors)
+
+
+def main(repeats: int = 200, bodies_in_view: int = 3):
+    rng = np.random.default_rng(0)
+    projection, canvas_shape = make_view()
+    canvas = np.zeros((*canvas_shape, 3), dtype=np.uint8)
+    scenes = [make_bodies(rng, bodies_in_view, canvas_shape) for _ in range(repeats)]
+    colors = [(0, 255, 0)] * bodies_in_view
+    print(f"view canvas {canvas_shape}, output {projection.output_size}, {bodies_in_view} bodies in view")
+
+    for name, fn in (('warp', warp), ('analytic', analytic)):
+        start = time.perf_counter()
+        for bodies in scenes:
+            fn(projection, canvas, bodies, colors)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>8}: {1e3 * elapsed / repeats:.3f} ms per view")
+
+    inter = union = 0
+    for bodies in scenes:
+        a = warp(projection, canvas, bodies, colors)[..., 1] >= 128
+        b = analytic(projection, canvas, bodies, colors)[..., 1] == 255
+        inter += (a & b).sum()
+        union += (a | b).sum()
+    print(f"pixel agreement (IoU): {inter / max(union, 1):.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+import pytest
+
+from cardumen.app import App
+from cardumen.handler import Handler
+
+
+@pytest.fixture
+def headless_config(monkeypatch, tmp_path):
+    monkeypatch.chdir("..")
+    with open("config.json") as f:
+        config = json.load(f)
+    config.update({
+        'dbPath': str(tmp_path / 'headless.db'),
+        'logFile': str(tmp_path / 'headless.log'),
+        'testing': True,
+        'headless': True,
+        'fixedDt': .01,
+        'headlessTicks': 20,
+        'seed': 42,
+        'paramNFish': 4,
+        'visionThreads': 1,
+    })
+    path = tmp_path / 'headless.json'
+    with open(path, 'w') as f:
+        json.dump(config, f)
+    return str(path)
+
+
+def run_headless(path):
+    app = App(path)
+    app.run()
+    fishes = app.scene.fishes
+    return np.array([[*fish.prs.pos, fish.prs.rot, fish.speed] for fish in fishes]), app
+
+
+def test_headless_deterministic(headless_config):
+    state1, app = run_headless(headless_config)
+    assert app.ticks_per_second > 0
+    assert app.scene.time == pytest.approx(.2)
+    state2, _ = run_headless(headless_config)
+    assert np.array_equal(state1, state2)
+
+
+def test_headless_render(headless_config, tmp_path):
+    with open(headless_config) as f:
+        config = json.load(f)
+    config.update({
+        'headlessRender': True,
+        'renderEvery': 5,
+        'renderSize': [200, 120],
+        'recordPath': str(tmp_path / 'frames'),
+    })
+    with open(headless_config, 'w') as f:
+        json.dump(config, f)
+    state1, app = run_headless(headless_config)
+    # initial state and every 5th of 20 ticks
+    assert app.display.recorder.captured == 5 and app.display.recorder.dropped == 0
+    frames = np.load(tmp_path / 'frames' / 'frames_00000.npy')
+    assert frames.shape == (5, 120, 200, 3)
+    assert frames.any() and not np.array_equal(frames[0], frames[-1])
+    # rendering does not change the simulation
+    config['headlessRender'] = False
+    with open(headless_config, 'w') as f:
+        json.dump(config, f)
+    state2, _ = run_headless(headless_config)
+    assert np.array_equal(state1, state2)
@@ -0,0 +1,96 @@
+from pygame import Vector2
+
+from cardumen.collision import Collider, CollisionWorld, SpatialHash
+from cardumen.geometry import PosRotScale
+from cardumen.shapes import Polygon
+
+
+def test_spatial_hash_query():
+    grid = SpatialHash((100, 100), cell_size=10)
+    grid.insert('a', (12, 12, 18, 18))
+    grid.insert('b', (52, 52, 58, 58))
+    assert list(grid.query((0, 0, 15, 15))) == ['a']
+    assert list(grid.query((45, 45, 50, 50))) == ['b']
+    assert list(grid.query((30, 30, 40, 40))) == []
+    grid.clear()
+    assert list(grid.query((0, 0, 100, 100))) == []
+
+
+def test_spatial_hash_wrap():
+    grid = SpatialHash((100, 100), cell_size=10)
+    grid.insert('a', (95, 95, 105, 105))
+    assert list(grid.query((0, 0, 2, 2))) == ['a']
+    assert list(grid.query((-8, 50, -2, 60))) == []
+    assert list(grid.query((-8, -8, -2, -2))) == ['a']
+
+    grid = SpatialHash((100, 100), cell_size=10, wrap=False)
+    grid.insert('a', (95, 95, 105, 105))
+    assert list(grid.query((0, 0, 2, 2))) == []
+
+
+def make_collider(parent, pos, tag, detect=None):
+    points = [Vector2(-5, -5), Vector2(5, -5), Vector2(5, 5), Vector2(-5, 5)]
+    return Collider(parent, Polygon(PosRotScale(Vector2(pos)), points), tag, detect=detect)
+
+
+def test_collision_world_events():
+    world = CollisionWorld((100, 100), cell_size=20, wrap=False)
+    sensor = make_collider('a', (10, 10), 'sensor', detect='body')
+    own_body = make_collider('a', (10, 10), 'body')
+    body = make_collider('b', (50, 50), 'body')
+    for collider in (sensor, own_body, body):
+        world.add(collider)
+    events = []
+    sensor.on_collision_start = lambda other: events.append(('start', other))
+    sensor.on_collision = lambda other: events.append(('stay', other))
+    sensor.on_collision_end = lambda other: events.append(('end', other))
+
+    world.step()
+    assert events == [] and not sensor.is_colliding()
+
+    body.poly.prs.pos = Vector2(15, 15)
+    world.step()
+    assert events == [('start', body), ('stay', body)]
+    assert sensor.is_colliding() and world.stats['contacts'] == 1
+
+    events.clear()
+    world.step()
+    assert events == [('stay', body)]
+
+    events.clear()
+    body.poly.prs.pos = Vector2(80, 80)
+    world.step()
+    assert events == [('end', body)] and not sensor.is_colliding()
+
+
+def test_collision_world_pairs_tested_once():
+    world = CollisionWorld((100, 100), cell_size=20, wrap=False)
+    a = make_collider('a', (10, 10), 'fish', detect='fish')
+    b = make_collider('b', (12, 12), 'fish', detect='fish')
+    world.add(a)
+    world.add(b)
+    world.step()
+    assert a.is_colliding_with(b) and b.is_colliding_with(a)
+    assert world.stats['candidates'] == 2 and world.stats['pairs'] == 1
+
+
+def test_collision_world_remove():
+    world = CollisionWorld((100, 100), cell_size=20, wrap=False)
+    sensor = make_collider('a', (10, 10), 'sensor', detect='body')
+    body = make_collider('b', (12, 12), 'body')
+    world.add(sensor)
+    world.add(body)
+    ended = []
+    sensor.on_collision_end = lambda other: ended.append(other)
+    world.step()
+    assert sensor.is_colliding()
+
+    body.remove()
+    assert body.world is None and len(world) == 1
+    world.step()
+    assert ended == [body] and not sensor.is_colliding()
+
+    sensor.remove()
+    world.add(body)
+    world.step()
+    assert not sensor.is_colliding() and world.stats['candidates'] == 0
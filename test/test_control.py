@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from cardumen.control import Agent, MLPPolicy, Policy
+
+
+def test_agent_act():
+    actions = Agent(7).act(np.zeros((50, 4)))
+    assert actions.shape == (50,)
+    assert actions.min() >= 0 and actions.max() < 7
+
+
+def test_mlp_act():
+    # single layer choosing the action from the sign of the x velocity
+    policy = MLPPolicy([np.array([[0, 0], [0, 0], [1, -1], [0, 0]])], [np.zeros(2)], use_views=False)
+    states = np.array([[0, 0, 1, 0], [0, 0, -1, 0]])
+    assert policy.act(states, None).tolist() == [0, 1]
+
+
+def test_mlp_views_save_load(tmp_path):
+    rng = np.random.default_rng(0)
+    states = rng.normal(size=(5, 4))
+    views = rng.integers(0, 256, (5, 3, 3, 3), dtype=np.uint8)
+    policy = MLPPolicy([rng.normal(size=(4 + 27, 8)), rng.normal(size=(8, 7))], [np.zeros(8), np.zeros(7)])
+    path = tmp_path / 'policy.npz'
+    policy.save(path)
+    loaded = MLPPolicy.load(path)
+    assert loaded.use_views
+    assert np.array_equal(loaded.act(states, views), policy.act(states, views))
+    # same as evaluating each fish on its own
+    single = [policy.act(states[i:i + 1], views[i:i + 1])[0] for i in range(5)]
+    assert policy.act(states, views).tolist() == single
+
+
+def test_policy_requires_act():
+    class NoAct(Policy):
+        pass
+
+    with pytest.raises(TypeError):
+        NoAct()
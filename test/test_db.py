@@ -1,4 +1,6 @@
 import os
+import sqlite3
+import threading
 import time
 
 import numpy as np
@@ -65,3 +67,149 @@ def test_data_get_all(mock_data_config):
     print(items[0][1].shape)
     print(items[0][2].shape)
     db.close()
+
+
+def count_rows(db_path, table_name):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(f'SELECT COUNT(*) FROM {table_name}').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def wait_rows(db_path, table_name, n, timeout=5.):
+    # rows are written by the writer thread
+    start = time.time()
+    while count_rows(db_path, table_name) != n:
+        assert time.time() - start < timeout
+        time.sleep(.01)
+
+
+def make_features(i):
+    return [np.full(4, i, dtype=np.float32), np.zeros((145, 145, 3), dtype=np.float32)]
+
+
+def test_buffered_rows(tmp_path, mock_table_name, mock_data_config):
+    db_path = str(tmp_path / 'buffered.db')
+    db = Database(db_path, 5)
+    db.connect()
+    table = Table(db, mock_table_name, mock_data_config)
+    table.create()
+    db.flush()
+    for i in range(4):
+        table.add(i, make_features(i))
+    assert count_rows(db_path, mock_table_name) == 0
+    table.add(4, make_features(4))
+    wait_rows(db_path, mock_table_name, 5)
+    for i in range(5, 7):
+        table.add(i, make_features(i))
+    # reads see the buffered rows
+    items = table.get_all()
+    assert [item[0] for item in items] == list(range(7))
+    assert np.array_equal(items[6][1], np.full(4, 6, dtype=np.float32))
+    table.add(7, make_features(7))
+    db.close()
+    assert count_rows(db_path, mock_table_name) == 8
+
+
+def test_buffered_bytes(tmp_path, mock_table_name, mock_data_config):
+    db_path = str(tmp_path / 'buffered.db')
+    # one row of features is about 250 kB
+    db = Database(db_path, 100, buffer_bytes=600_000)
+    db.connect()
+    table = Table(db, mock_table_name, mock_data_config)
+    table.create()
+    db.flush()
+    table.add(0, make_features(0))
+    table.add(1, make_features(1))
+    assert count_rows(db_path, mock_table_name) == 0
+    table.add(2, make_features(2))
+    wait_rows(db_path, mock_table_name, 3)
+    db.close()
+
+
+def test_writer_thread(tmp_path, mock_table_name, mock_data_config):
+    db_path = str(tmp_path / 'writer.db')
+    db = Database(db_path, 1000, queue_size=4)
+    db.connect()
+    table = Table(db, mock_table_name, mock_data_config)
+    table.create()
+    for i in range(50):
+        table.add(i, make_features(i))
+    assert db.dropped == 0
+    # close drains the queue and writes the buffered rows
+    db.close()
+    assert count_rows(db_path, mock_table_name) == 50
+    conn = sqlite3.connect(db_path)
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    conn.close()
+
+
+class Gate:
+    """Answer to a flush that holds the writer thread until opened."""
+
+    def __init__(self):
+        self.entered = threading.Event()
+        self.opened = threading.Event()
+
+    def set(self):
+        self.entered.set()
+        self.opened.wait()
+
+
+def test_writer_drop(tmp_path):
+    db = Database(str(tmp_path / 'writer.db'), queue_size=1, backpressure='drop')
+    db.connect()
+    gate = Gate()
+    db._queue.put((Database._FLUSH, None, gate, 0))
+    gate.entered.wait()
+    # the writer is held, the first row fills the queue
+    db.insert('INSERT INTO t VALUES (?)', (0,))
+    db.insert('INSERT INTO t VALUES (?)', (1,))
+    assert db.dropped == 1
+    gate.opened.set()
+    with pytest.raises(RuntimeError):
+        db.close()  # table t does not exist
+
+
+def test_read_after_close(tmp_path, mock_table_name, mock_data_config):
+    db = Database(str(tmp_path / 'closed.db'))
+    db.connect()
+    table = Table(db, mock_table_name, mock_data_config)
+    table.create()
+    db.close()
+    with pytest.raises(RuntimeError):
+        db.flush()
+    with pytest.raises(RuntimeError):
+        table.get_all()
+    with pytest.raises(RuntimeError):
+        table.add(0, make_features(0))
+
+
+def test_writer_error(tmp_path):
+    db = Database(str(tmp_path / 'writer.db'))
+    db.connect()
+    db.execute('INSERT INTO missing VALUES (1)')
+    with pytest.raises(RuntimeError):
+        db.flush()
+    with pytest.raises(RuntimeError):
+        db.close()
+
+
+def test_failed_write_rolls_back(tmp_path, mock_table_name, mock_data_config):
+    db_path = str(tmp_path / 'rollback.db')
+    db = Database(db_path, 2)
+    db.connect()
+    table = Table(db, mock_table_name, mock_data_config)
+    table.create()
+    table.add(0, make_features(0))
+    # the second table does not exist, so the whole batch is rolled back, the valid row too
+    db.insert('INSERT INTO missing VALUES (?)', (1,))
+    with pytest.raises(RuntimeError):
+        db.flush()
+    with pytest.raises(RuntimeError):
+        db.close()
+    assert count_rows(db_path, mock_table_name) == 0
+    # the rows are not retried, the failed writer is stopped and the reader connection closed
+    assert not db._writer.is_alive()
+    assert db._conn is None
@@ -0,0 +1,92 @@
+import numpy as np
+import pygame
+import pytest
+
+from cardumen.config import Config
+from cardumen.display import Display
+from cardumen.handler import Handler
+from cardumen.snapshot import Snapshot
+from cardumen.sprite import Sprite
+
+
+@pytest.fixture
+def display(monkeypatch):
+    monkeypatch.chdir("..")
+    monkeypatch.setenv('SDL_VIDEODRIVER', 'dummy')
+    Handler().set_config(Config("config.json"))
+    pygame.display.init()
+    yield Display(Handler().config.WINDOW_SIZE)
+    pygame.display.quit()
+
+
+def test_overlay_composited_once(display):
+    big = [pygame.Vector2(p) for p in ((100, 100), (160, 100), (160, 160), (100, 160))]
+    small = [pygame.Vector2(p) for p in ((120, 120), (130, 120), (120, 130))]  # triangle, half of its rect
+    color = (255, 0, 0, 50)
+
+    display.screen.fill((0, 0, 0))
+    display.draw_polygon(big, color, color, wrap=False)
+    display.draw_polygon(small, color, color, wrap=False)
+    display.draw_overlay()
+    result = pygame.surfarray.array3d(display.screen)
+
+    # both polygons drawn on one overlay, composited once
+    overlay = pygame.Surface(display.screen.get_size(), pygame.SRCALPHA)
+    for points in (big, small):
+        pygame.draw.polygon(overlay, color, points)
+        pygame.draw.lines(overlay, color, True, points)
+    display.screen.fill((0, 0, 0))
+    display.screen.blit(overlay, (0, 0))
+    expected = pygame.surfarray.array3d(display.screen)
+
+    assert np.array_equal(result, expected)
+    assert result[128, 128, 0] == result[140, 140, 0]  # outside the triangle, inside its rect
+    # the overlay is cleared
+    assert not pygame.surfarray.pixels_alpha(display._overlay).any()
+
+
+def test_merge_rects():
+    rects = [pygame.Rect(0, 0, 10, 10), pygame.Rect(5, 5, 10, 10), pygame.Rect(20, 0, 5, 5),
+             pygame.Rect(10, 0, 10, 5)]
+    merged = Display._merge_rects(rects)
+    for i, a in enumerate(merged):
+        assert a.collidelist(merged[i + 1:]) < 0
+        assert all(a.contains(b) or not a.colliderect(b) for b in rects)
+    assert all(any(a.contains(b) for a in merged) for b in rects)
+
+
+def make_snapshot(t, sprites, background, bg_pos=(500, 300), debug=True):
+    n = len(sprites)
+    pos = np.array([[100 + 40 * i + 25 * t, 100 + 30 * i + 10 * t] for i in range(n)], dtype=float)
+    pos = np.vstack([bg_pos, pos])
+    polygons = [(row + 1, pos[row + 1] + [[-10, -10], [10, -10], [0, 10]], (255, 0, 0, 50), (0, 255, 0, 100))
+                for row in range(n)] if debug else []
+    return Snapshot(t, np.arange(n + 1), pos, np.array([0, *(.3 * t + i for i in range(n))]), np.ones(n + 1),
+                    np.array([0, *range(1, n + 1)]), (background, *sprites),
+                    np.array([False] + [True] * n), polygons, debug, static=np.array([True] + [False] * n))
+
+
+def full_redraw(display, snapshot):
+    # reference: the whole snapshot drawn onto an empty screen
+    screen = display.screen
+    display.screen = pygame.Surface(screen.get_size())
+    display.screen.fill((0, 0, 0))
+    snapshot.render(display)
+    frame = pygame.surfarray.array3d(display.screen)
+    display.screen = screen
+    return frame
+
+
+@pytest.mark.parametrize('debug', [False, True])
+def test_dirty_frames_match_full_redraw(display, debug):
+    sprites = [Sprite(f"assets/fish{i % 7 + 1}.png", scale=.05) for i in range(5)]
+    background = Sprite("assets/water.png", scale=.5)
+    snapshots = [make_snapshot(t, sprites, background, debug=debug) for t in range(4)]
+    # the static background moves, which forces a full redraw, then frames are dirty again
+    snapshots += [make_snapshot(t, sprites, background, bg_pos=(450, 280), debug=debug) for t in range(4, 7)]
+    presented = []  # regions updated on screen, None for the whole screen
+    display._present = presented.append
+    for snapshot in snapshots:
+        display.draw_snapshot(snapshot)
+        assert np.array_equal(pygame.surfarray.array3d(display.screen), full_redraw(display, snapshot))
+    assert [rects is None for rects in presented] == [True, False, False, False, True, False, False]
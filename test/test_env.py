@@ -0,0 +1,44 @@
+import json
+
+import numpy as np
+import pytest
+
+from cardumen.env import VectorEnv
+
+
+@pytest.fixture
+def env_config(monkeypatch, tmp_path):
+    monkeypatch.chdir("..")
+    with open("config.json") as f:
+        config = json.load(f)
+    config.update({
+        'dbPath': str(tmp_path / 'env.db'),
+        'logFile': str(tmp_path / 'env.log'),
+        'testing': True,
+        'fixedDt': .01,
+        'paramNFish': 3,
+    })
+    path = tmp_path / 'env.json'
+    with open(path, 'w') as f:
+        json.dump(config, f)
+    return str(path)
+
+
+def run_env(path, n_workers, actions):
+    with VectorEnv(3, path, n_workers=n_workers, seed=7) as env:
+        for step_actions in actions:
+            states, views = env.step(step_actions)
+        return states.copy(), views.copy()
+
+
+def test_vector_env(env_config, tmp_path):
+    actions = [np.full((3, 3), 5), None, np.zeros((3, 3), dtype=int)]
+    states1, views1 = run_env(env_config, 1, actions)
+    assert states1.shape == (3, 3, 4)
+    assert views1.shape[:2] == (3, 3)
+    # same seed, same result regardless of the number of workers
+    states2, views2 = run_env(env_config, 2, actions)
+    assert np.array_equal(states1, states2)
+    assert np.array_equal(views1, views2)
+    # each scene has its own database
+    assert all((tmp_path / f'env_{i}.db').exists() for i in range(3))
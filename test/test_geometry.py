@@ -60,3 +60,16 @@ def test_posrotscale_magic(pi):
     assert prs1 == prs2
     # repr
     assert repr(prs1) == "PosRotScale(pos=[1, 2], rot=3, scale=4)"
+
+
+def test_posrotscale_version(pi):
+    prs = geometry.PosRotScale(Vector2(1, 2))
+    version = prs.version
+    prs.pos += Vector2(1, 0)
+    assert prs.version > version
+    version = prs.version
+    prs.rot = pi / 2
+    assert prs.version > version
+    assert abs(prs.cos) < 1e-12
+    assert prs.sin == 1
+    assert prs.rot_deg == 90
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from cardumen.neighbours import NeighbourIndex
+
+
+def brute_force(pos, size, wrap):
+    d = pos[None] - pos[:, None]
+    if wrap:
+        d -= size * np.round(d / size)
+    dist = np.hypot(d[..., 0], d[..., 1])
+    np.fill_diagonal(dist, np.inf)
+    return dist
+
+
+@pytest.mark.parametrize('wrap', [True, False])
+def test_query_radius(wrap):
+    rng = np.random.default_rng(0)
+    size = np.array([300., 200.])
+    pos = rng.uniform(0, 1, (200, 2)) * size
+    index = NeighbourIndex(size, 40, wrap)
+    index.build(pos)
+    dist = brute_force(pos, size, wrap)
+    for radius in (10, 40, 75, 500):
+        i, j, d, _ = index.query_radius(radius)
+        expected = np.argwhere(dist <= radius)
+        assert sorted(zip(i, j)) == sorted(map(tuple, expected))
+        assert np.allclose(d, dist[i, j])
+        assert np.all(np.diff(i) >= 0)
+
+
+@pytest.mark.parametrize('wrap', [True, False])
+def test_query_knn(wrap):
+    rng = np.random.default_rng(1)
+    size = np.array([300., 200.])
+    pos = rng.uniform(0, 1, (100, 2)) * size
+    index = NeighbourIndex(size, 30, wrap)
+    index.build(pos)
+    indices, distances, _ = index.query_knn(5)
+    expected = np.sort(brute_force(pos, size, wrap), axis=1)[:, :5]
+    assert np.allclose(distances, expected)
+    assert np.allclose(brute_force(pos, size, wrap)[np.arange(100)[:, None], indices], distances)
+
+
+def test_query_knn_padding():
+    index = NeighbourIndex((100, 100), 10)
+    index.build(np.array([[10., 10.], [20., 10.]]))
+    indices, distances, bearings = index.query_knn(3)
+    assert indices.tolist() == [[1, -1, -1], [0, -1, -1]]
+    assert np.isinf(distances[:, 1:]).all()
+    assert np.isnan(bearings[:, 1:]).all()
+
+
+def test_bearing():
+    index = NeighbourIndex((100, 100), 10)
+    # first point faces right, second faces up; the y axis points down
+    index.build(np.array([[50., 50.], [50., 40.]]), rot=np.array([0, np.pi / 2]))
+    i, j, _, bearings = index.query_radius(20)
+    # the second point is on the left of the first, the first is right behind the second
+    assert np.allclose(bearings, [np.pi / 2, -np.pi])
+    # across the border
+    index.build(np.array([[1., 50.], [99., 50.]]))
+    i, j, d, bearings = index.query_radius(5)
+    assert np.allclose(d, [2, 2])
+    assert np.allclose(np.abs(bearings), [np.pi, 0])
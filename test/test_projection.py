@@ -1,7 +1,11 @@
+import cv2
 import numpy as np
 from pygame import Vector2
 
+from cardumen import raster
+from cardumen.geometry import PosRotScale
 from cardumen.projection import Projection
+from cardumen.shapes import ConvexQuad
 
 
 def test_projection():
@@ -18,3 +22,40 @@ def test_projection():
     proj_arr = projection(arr)
     assert np.array_equal(proj_arr, arr[:3, :3, :])
 
+
+def test_project_polygons_agreement():
+    rng = np.random.default_rng(0)
+    src_points = [Vector2(0, 69), Vector2(138, 0), Vector2(138, 138), Vector2(0, 92)]
+    projection = Projection(src_points, (145, 145))
+    polygons, colors = [], []
+    for _ in range(5):
+        center = rng.uniform(0, 138, 2)
+        angle = rng.uniform(0, np.pi)
+        half = np.array([[-38, -11], [38, -11], [38, 11], [-38, 11]])
+        rot = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+        polygons.append(half @ rot.T + center)
+        colors.append((0, 255, 0))
+
+    canvas = np.zeros((139, 139, 3), dtype=np.uint8)
+    for points, color in zip(polygons, colors):
+        raster.fill_convex_polygon(canvas, points, color)
+    warped = projection(canvas)[..., 1] >= 128
+    analytic = projection.project_polygons(polygons, colors)[..., 1] == 255
+
+    union = (warped | analytic).sum()
+    assert union > 0
+    assert (warped & analytic).sum() / union > .95
+
+
+def test_projection_cache():
+    points = [Vector2(0, -2), Vector2(12, -12), Vector2(12, 12), Vector2(0, 2)]
+    p1 = Projection.from_convex_quad(ConvexQuad(PosRotScale(), points))
+    p2 = Projection.from_convex_quad(ConvexQuad(PosRotScale(Vector2(5, 5), 1), list(points)))
+    p3 = Projection.from_convex_quad(ConvexQuad(PosRotScale(), [p * 2 for p in points]))
+    assert p1 is p2
+    assert p1 is not p3
+
+    # precomputed maps agree with warping the whole image, up to the 1/32 px rounding of the fixed-point maps
+    arr = (np.random.rand(24, 12, 3) * 255).astype(np.uint8)
+    warped = cv2.warpPerspective(arr, p1._M, p1.output_size)
+    assert np.abs(p1(arr).astype(int) - warped).max() <= 8
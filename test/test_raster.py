@@ -0,0 +1,19 @@
+import numpy as np
+
+from cardumen import raster
+
+
+def test_fill_convex_polygon():
+    buffer = np.zeros((10, 10, 3), dtype=np.uint8)
+    raster.fill_convex_polygon(buffer, np.array([[2, 2], [6, 2], [6, 5], [2, 5]]), (0, 255, 0))
+    filled = buffer[..., 1] == 255
+    assert filled[2:6, 2:7].all()
+    assert filled.sum() == 4 * 5
+    assert not buffer[..., 0].any()
+
+    # orientation does not matter, out of bounds parts are clipped
+    other = np.zeros((10, 10, 3), dtype=np.uint8)
+    raster.fill_convex_polygon(other, np.array([[2, 5], [6, 5], [6, 2], [2, 2]]), (0, 255, 0))
+    assert np.array_equal(buffer, other)
+    raster.fill_convex_polygon(other, np.array([[-5, -5], [20, -5], [20, 20]]), (255, 0, 0))
+    assert other[0, 9, 0] == 255 and other[9, 0, 0] == 0
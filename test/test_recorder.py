@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pygame
+import pytest
+
+from cardumen.recorder import FrameRecorder
+
+
+def make_frame(i, size=(32, 24)):
+    surface = pygame.Surface(size)
+    surface.fill((i, 2 * i, 3 * i))
+    surface.set_at((1, 2), (255, 0, 0))
+    return surface
+
+
+def test_npy_chunks(tmp_path):
+    path = str(tmp_path / 'frames')
+    recorder = FrameRecorder(path, (32, 24), 30, pool_size=2, policy='block', chunk_size=4)
+    for i in range(10):
+        assert recorder.capture(make_frame(i))
+    recorder.close()
+    assert sorted(os.listdir(path)) == ['frames_00000.npy', 'frames_00001.npy', 'frames_00002.npy']
+    frames = np.concatenate([np.load(os.path.join(path, f'frames_{i:05d}.npy')) for i in range(3)])
+    assert frames.shape == (10, 24, 32, 3)
+    assert tuple(frames[7, 0, 0]) == (7, 14, 21)
+    assert tuple(frames[7, 2, 1]) == (255, 0, 0)
+    assert recorder.captured == 10 and recorder.dropped == 0
+
+
+def test_drop_when_pool_full(tmp_path):
+    recorder = FrameRecorder(str(tmp_path / 'frames'), (32, 24), 30, pool_size=1, policy='drop')
+    recorder._free.get()  # the only buffer is being written
+    assert not recorder.capture(make_frame(0))
+    assert recorder.dropped == 1
+    recorder.close()
+
+
+def test_video(tmp_path):
+    path = str(tmp_path / 'run.avi')
+    recorder = FrameRecorder(path, (32, 24), 30, policy='block')
+    for i in range(5):
+        recorder.capture(make_frame(20 * i))
+    recorder.close()
+    assert os.path.getsize(path) > 0
+
+
+def test_unknown_policy(tmp_path):
+    with pytest.raises(ValueError):
+        FrameRecorder(str(tmp_path), (32, 24), 30, policy='skip')
+
+
+def test_writer_error_disables_recording(tmp_path):
+    # the video cannot be opened in a missing directory
+    recorder = FrameRecorder(str(tmp_path / 'missing' / 'run.avi'), (32, 24), 30, policy='block')
+    recorder._thread.join(timeout=5)
+    assert recorder._error is not None
+    assert not recorder.capture(make_frame(0))
+    assert not recorder.capture(make_frame(1))
+    assert recorder.captured == 0
+    recorder.close()
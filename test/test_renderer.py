@@ -0,0 +1,49 @@
+import numpy as np
+
+from cardumen.renderer import SnapshotRing
+from cardumen.snapshot import Snapshot
+
+
+def make_snapshot(n, debug=True):
+    rng = np.random.default_rng(n)
+    polygons = [(row, rng.uniform(0, 100, (4, 2)), (255, 0, 0, 50), (0, 255, 0)) for row in range(n)] if debug else []
+    return Snapshot(1.5, np.arange(n) + 10, rng.uniform(0, 100, (n, 2)), rng.uniform(-3, 3, n), np.ones(n),
+                    np.arange(n) % 7 + 1, ('sprite',) * n, np.ones(n, dtype=bool), polygons, debug, (100, 100))
+
+
+def test_ring_round_trip():
+    writer = SnapshotRing(8)
+    reader = SnapshotRing(8, name=writer.name)
+    try:
+        assert reader.read({0: 'sprite'}) == (0, None)
+        snapshot = make_snapshot(5)
+        writer.write(snapshot, np.zeros(5, dtype=int))
+        seq, copy = reader.read({0: 'sprite'})
+        assert seq == 1
+        for field in ('ids', 'pos', 'rot', 'scale', 'cat', 'wrap'):
+            assert np.array_equal(getattr(copy, field), getattr(snapshot, field))
+        assert copy.stamp == snapshot.stamp and copy.time == 1.5 and copy.world_size == (100, 100)
+        assert copy.sprites == snapshot.sprites
+        assert [p[0] for p in copy.polygons] == list(range(5))
+        assert np.array_equal(copy.polygons[2][1], snapshot.polygons[2][1])
+        assert copy.polygons[0][2:] == ((255, 0, 0, 50), (0, 255, 0, 255))
+        # slots are reused in turn
+        for i in range(4):
+            writer.write(make_snapshot(i, debug=False), np.zeros(i, dtype=int))
+        seq, copy = reader.read({0: 'sprite'})
+        assert seq == 5 and len(copy) == 3 and copy.polygons == ()
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_ring_missing_sprite_and_capacity():
+    writer = SnapshotRing(4)
+    try:
+        writer.write(make_snapshot(6), np.arange(6))
+        assert writer.read({0: 'a'}) == (1, None)
+        seq, copy = writer.read({i: 'a' for i in range(6)})
+        assert len(copy) == 4
+        assert all(p[0] < 4 for p in copy.polygons)
+    finally:
+        writer.close()
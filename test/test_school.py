@@ -0,0 +1,86 @@
+import numpy as np
+from pygame import Vector2
+
+from cardumen.school import School, SchoolPosRotScale
+
+
+def make_school(n):
+    school = School(capacity=1, action_table=[(0, 1), (1, 1), (0, 2)])
+    members = []
+    for i in range(n):
+        prs = SchoolPosRotScale(Vector2(10 * i, 50), 0, 1)
+        school.add(prs)
+        i = prs.index
+        school.speed[i] = 10
+        school.min_speed[i] = 1
+        school.max_speed[i] = 15
+        school.tilt_speed[i] = 1
+        members.append(prs)
+    return school, members
+
+
+def test_school_add_grow():
+    school, members = make_school(5)
+    assert len(school) == 5
+    assert [prs.index for prs in members] == list(range(5))
+    assert members[3].pos == (30, 50)
+
+
+def test_school_remove_swap():
+    school, members = make_school(4)
+    school.remove(members[1])
+    assert len(school) == 3
+    assert members[1].school is not school
+    assert members[1].pos == (10, 50)
+    assert members[3].index == 1
+    assert members[3].pos == (30, 50)
+
+
+def test_school_step():
+    school, members = make_school(3)
+    school.action[:3] = [0, 1, 2]
+    school.step(1, (100, 100))
+    assert members[0].pos == (10, 50)
+    assert members[1].rot == 1
+    assert members[1].pos == Vector2(10, 50) + Vector2(10 * np.cos(1), -10 * np.sin(1))
+    assert school.speed[2] == 15  # clamped
+    assert members[2].pos == (35, 50)
+
+
+def test_school_step_wrap():
+    school, members = make_school(1)
+    members[0].pos = Vector2(95, -3)
+    school.step(1, (100, 100))
+    assert members[0].pos == (5, 97)
+
+
+def test_school_version():
+    school, members = make_school(2)
+    prs = members[0]
+    version = prs.version
+    school.step(.1, (100, 100))
+    assert prs.version > version
+    version = prs.version
+    school.remove(prs)
+    assert prs.version > version
+    version = prs.version
+    prs.rot = 1
+    assert prs.version > version
+
+
+def test_pos_assignment():
+    school, members = make_school(3)
+    prs = members[1]
+    version = prs.version
+    # the position is a copy of the row, only assignments move the fish
+    pos = prs.pos
+    pos.x += 5
+    assert tuple(school.pos[prs.index]) == (10, 50)
+    assert prs.version == version
+    prs.pos += Vector2(5, 0)
+    assert tuple(school.pos[prs.index]) == (15, 50)
+    assert prs.version > version
+    # the row of the object may change, e.g. when another fish is removed
+    school.remove(members[0])
+    members[2].pos = Vector2(21, 50)
+    assert tuple(school.pos[members[2].index]) == (21, 50)
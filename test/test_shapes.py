@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from pygame import Vector2
+
+from cardumen.config import Config
+from cardumen.geometry import PosRotScale
+from cardumen.handler import Handler
+from cardumen.shapes import Intersection, Polygon
+
+
+@pytest.fixture
+def config(monkeypatch):
+    monkeypatch.chdir("..")
+    config = Config("config.json")
+    Handler().set_config(config)
+    return config
+
+
+def square(x, y, side):
+    return np.array([[x, y], [x + side, y], [x + side, y + side], [x, y + side]], dtype=float)
+
+
+def test_intersect_batch():
+    tri = np.array([[0, 0], [4, 0], [0, 4]], dtype=float)
+    polys1 = np.stack([square(0, 0, 2), square(0, 0, 2), square(0, 0, 10), square(0, 0, 2)])
+    polys2 = np.stack([square(1, 1, 2), square(5, 5, 2), square(4, 4, 1), square(2, 0, 2)])
+    # overlapping, disjoint, contained, touching
+    assert Intersection.intersect_batch(polys1, polys2).tolist() == [True, False, True, True]
+    # separated along a diagonal, where bounding boxes still overlap
+    assert Intersection.intersect_batch(tri[None], square(2.5, 2.5, 1)[None]).tolist() == [False]
+    assert Intersection.intersect_batch(tri[None], square(1.5, 1.5, 1)[None]).tolist() == [True]
+
+
+def test_intersects_wrap(config):
+    width, height = config.WINDOW_SIZE
+    points = [Vector2(-10, -10), Vector2(10, -10), Vector2(10, 10), Vector2(-10, 10)]
+    poly = Polygon(PosRotScale(Vector2(5, 5)), points)
+    corner = Polygon(PosRotScale(Vector2(width - 5, height - 5)), points)
+    far = Polygon(PosRotScale(Vector2(width / 2, height / 2)), points)
+    assert poly.intersects(corner)
+    assert not poly.intersects(corner, check_wrap=False)
+    assert not poly.intersects(far)
+    assert poly.intersects_many([corner, far]).tolist() == [True, False]
+    assert poly.intersects_many([corner, far], check_wrap=False).tolist() == [False, False]
+
+
+def test_points_cache():
+    points = [Vector2(1, 0), Vector2(0, 2), Vector2(-1, 0)]
+    prs = PosRotScale(Vector2(10, 10))
+    poly = Polygon(prs, points)
+    assert poly.points == [Vector2(11, 10), Vector2(10, 12), Vector2(9, 10)]
+    assert poly.aabb == (9, 10, 11, 12)
+    # move, assigned so that the version changes
+    prs.pos += Vector2(1, 0)
+    assert poly.aabb == (10, 10, 12, 12)
+    # rotation
+    prs.rot = 3.141592653589793
+    expected = [(prs.scale * p.rotate(-prs.rot_deg) + prs.pos) for p in points]
+    assert np.allclose(poly.vertices, expected)
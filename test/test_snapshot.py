@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from pygame import Vector2
+
+from cardumen.entities import Entity
+from cardumen.geometry import PosRotScale
+from cardumen.snapshot import Snapshot, SnapshotBuffer
+
+
+def make_snapshot(pos, rot, ids=(1, 2), world_size=(100, 100)):
+    n = len(ids)
+    return Snapshot(0, np.array(ids), np.array(pos, dtype=float), np.array(rot, dtype=float), np.ones(n),
+                    np.ones(n, dtype=int), (None,) * n, np.ones(n, dtype=bool), world_size=world_size)
+
+
+def test_snapshot_read_only():
+    snapshot = make_snapshot([[0, 0], [1, 1]], [0, 0])
+    with pytest.raises(ValueError):
+        snapshot.pos[0, 0] = 5
+
+
+def test_interpolate():
+    s0 = make_snapshot([[10, 10], [98, 50]], [0.1, np.pi - .1])
+    s1 = make_snapshot([[20, 10], [2, 50]], [0.3, -np.pi + .1])
+    mid = s0.interpolate(s1, .5)
+    assert np.allclose(mid.pos, [[15, 10], [0, 50]])  # shortest path across the border
+    assert np.allclose(np.cos(mid.rot), [np.cos(.2), -1])  # shortest arc
+    assert s0.interpolate(s1, 1) is s1
+
+
+def test_interpolate_matches_ids():
+    s0 = make_snapshot([[10, 10], [50, 50]], [0, 0], ids=(1, 2))
+    s1 = make_snapshot([[60, 50], [20, 10], [30, 30]], [0, 0, 0], ids=(2, 1, 3))
+    mid = s0.interpolate(s1, .5)
+    assert np.allclose(mid.pos, [[55, 50], [15, 10], [30, 30]])
+
+
+def test_capture_stable_ids():
+    sprite = object()  # only referenced by the snapshot
+    removed = Entity(PosRotScale(Vector2(10, 10)), sprite)
+    scene = SimpleNamespace(time=0, layers={0: [removed]})
+    s0 = Snapshot.capture(scene)
+    del removed
+    # a new entity never takes the id of a removed one, even if it gets its memory
+    added = Entity(PosRotScale(Vector2(50, 50)), sprite)
+    scene.layers[0] = [added]
+    s1 = Snapshot.capture(scene)
+    assert s1.ids[0] == added.id != s0.ids[0]
+    assert np.allclose(s0.interpolate(s1, .5).pos, [[50, 50]])
+
+
+def test_buffer_at():
+    buffer = SnapshotBuffer()
+    assert buffer.at(0) is None
+    s0 = make_snapshot([[10, 10], [50, 50]], [0, 0])
+    s1 = make_snapshot([[20, 10], [50, 50]], [0, 0])
+    s0.stamp, s1.stamp = 1., 2.
+    buffer.publish(s0)
+    buffer.publish(s1)
+    assert buffer.latest() is s1
+    assert buffer.at(0) is s0
+    assert buffer.at(3) is s1
+    assert np.allclose(buffer.at(1.25).pos[0], [12.5, 10])
@@ -0,0 +1,40 @@
+import pytest
+
+from cardumen.geometry import deg2rad
+from cardumen.sprite import Sprite, rotate_scale_surface
+
+
+@pytest.fixture
+def sprite(monkeypatch):
+    monkeypatch.chdir("..")
+    return Sprite("assets/fish1.png", rot=deg2rad(-90), scale=.05)
+
+
+def test_atlas_hit(sprite):
+    surface = sprite.get_transformed(deg2rad(30), 1)
+    assert sprite.get_transformed(deg2rad(30.2), 1) is surface  # same 1 degree step
+    assert sprite.get_transformed(deg2rad(31), 1) is not surface
+    expected = rotate_scale_surface(sprite._image, deg2rad(-60), .05)
+    assert surface.get_size() == expected.get_size()
+
+
+def test_atlas_eviction(sprite, monkeypatch):
+    monkeypatch.setattr(Sprite, 'ATLAS_BYTES', 1)
+    first = sprite.get_transformed(deg2rad(10))
+    sprite.get_transformed(deg2rad(20))
+    assert len(Sprite._ATLAS) == 1
+    assert sprite.get_transformed(deg2rad(10)) is not first
+
+
+def test_size_cache(sprite):
+    expected = rotate_scale_surface(sprite._image, deg2rad(-90), .05).get_size()
+    assert (sprite.width, sprite.height) == expected
+    sprite.apply_transform(scale=2)
+    assert (sprite.width, sprite.height) == rotate_scale_surface(sprite._image, deg2rad(-90), .1).get_size()
+
+
+def test_shared_image(sprite):
+    other = Sprite("assets/fish1.png", scale=.1)
+    assert other._image is sprite._image
+    assert Sprite("assets/fish1.png", alpha=100)._image is not sprite._image
+    assert Sprite("assets/fish2.png")._image is not sprite._image
@@ -0,0 +1,84 @@
+import json
+
+import numpy as np
+import pytest
+
+from cardumen import raster, utils
+from cardumen.app import App
+from cardumen.vision import VisionStage
+
+
+@pytest.fixture
+def scene(monkeypatch, tmp_path):
+    monkeypatch.chdir("..")
+    with open("config.json") as f:
+        config = json.load(f)
+    config.update({
+        'dbPath': str(tmp_path / 'vision.db'),
+        'logFile': str(tmp_path / 'vision.log'),
+        'testing': True,
+        'headless': True,
+        'seed': 3,
+        'paramNFish': 40,
+        'visionThreads': 1,
+    })
+    path = tmp_path / 'vision.json'
+    with open(path, 'w') as f:
+        json.dump(config, f)
+    app = App(str(path))
+    for _ in range(3):
+        app.scene.update(.01)
+    yield app.scene
+    app.scene.vision.close()
+    app.db.close()
+
+
+def serial_views(fishes):
+    # each fish on its own: draw the visible bodies on the view canvas and warp it
+    views = []
+    for fish in fishes:
+        canvas = np.zeros_like(fish.view_detect)
+        view = fish.view.poly
+        for body in fish.view._colliding:
+            reach = view.bounding_radius + body.poly.bounding_radius
+            for offset in utils.get_near_wraps(view.prs.pos - body.poly.prs.pos, reach):
+                local = view.prs.to_local(body.poly.vertices + np.array(offset)) - fish.view_origin
+                raster.fill_convex_polygon(canvas, local, body.poly.fill_color[:3])
+        views.append(fish.view_projection(canvas))
+    return np.array(views)
+
+
+def test_pool_matches_serial(scene):
+    fishes = scene.fishes
+    expected = serial_views(fishes)
+    assert expected.any()  # some fish see others
+    stage = VisionStage('warp', workers=4)
+    try:
+        assert np.array_equal(stage.update(fishes), expected)
+        for fish, out in zip(fishes, expected):
+            assert np.array_equal(fish.view_state, out)
+    finally:
+        stage.close()
+
+
+def test_buffer_growth_and_slots(scene):
+    fishes = scene.fishes
+    stage = VisionStage('warp', workers=3)
+    try:
+        for subset in (fishes[:5], fishes, fishes[::3], fishes[::-1]):
+            observations = stage.update(subset)
+            assert len(observations) == len(subset)
+            assert np.array_equal(observations, serial_views(subset))
+            # each fish view state is its slot of the stacked buffer
+            for i, fish in enumerate(subset):
+                assert np.shares_memory(fish.view_state, observations[i])
+        assert len(stage._buffer) >= len(fishes)
+    finally:
+        stage.close()
+
+
+def test_close_shuts_pool_down():
+    stage = VisionStage('warp', workers=2)
+    stage.close()
+    with pytest.raises(RuntimeError):
+        stage._executor.submit(int)